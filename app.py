@@ -1,6 +1,7 @@
 # app.py (V2 - 具备完整排程逻辑)
 
 import database_manager
+import db_profiler  # 设置 TASKY_DB_PROFILE=1 时自动启用数据库性能分析
 import task_scheduler
 import json
 
@@ -45,7 +46,7 @@ def run_master_schedule_for_date(target_date: str):
     # 1. 从数据库获取所需信息
     print("[1] 从数据库获取固定事件和灵活任务...")
     fixed_events = database_manager.get_fixed_events(target_date)
-    flexible_tasks = database_manager.get_flexible_tasks()
+    flexible_tasks = database_manager.get_flexible_tasks(target_date)
     
     if not flexible_tasks:
         print("[!] 没有需要排程的灵活任务，流程结束。")
@@ -57,11 +58,9 @@ def run_master_schedule_for_date(target_date: str):
     # 2. 调用智能排程器AI大脑
     print("[2] 调用 task_scheduler AI大脑进行规划...")
     # 我们需要从灵活任务中提取特定字段给AI
-    tasks_for_ai = [
-        {"task_name": t["task_name"], "duration_minutes": t["duration_minutes"], "priority": t["priority"]}
-        for t in flexible_tasks
-    ]
-    schedule_result = task_scheduler.schedule_tasks(tasks_for_ai, fixed_events, target_date)
+    tasks_for_ai = [t.to_schedule_json() for t in flexible_tasks]
+    events_for_ai = [e.to_event_json() for e in fixed_events]
+    schedule_result = task_scheduler.schedule_tasks(tasks_for_ai, events_for_ai, target_date)
     
     if not schedule_result:
         print("❌ AI排程失败，流程终止。")
@@ -99,4 +98,7 @@ if __name__ == "__main__":
     
     # 查看最终结果
     print("\n--- 查看排程后的最终数据库状态 ---")
-    database_manager.get_all_tasks()
\ No newline at end of file
+    database_manager.get_all_tasks()
+
+    if db_profiler.is_enabled():
+        print("\n" + db_profiler.format_report())
\ No newline at end of file
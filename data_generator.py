@@ -0,0 +1,150 @@
+# data_generator.py (V1 - 生成大规模测试数据)
+"""
+合成数据生成器
+
+按给定规模和随机种子生成可复现的任务数据：固定事件、灵活任务、带子任务的父任务、
+历史已完成任务，以及少量重复任务系列。数据以生成器的方式分块写入，内存占用与规模无关。
+
+默认写入 tasky_bench.db，避免覆盖日常使用的 tasky.db。
+
+用法: python data_generator.py [任务数量] [--seed 42] [--db tasky_bench.db]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import database_manager
+
+DEFAULT_BENCH_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tasky_bench.db')
+BASE_DATE = datetime.date(2025, 9, 19)
+CHUNK_SIZE = 10000
+
+_VERBS = ["完成", "整理", "准备", "回复", "评审", "撰写", "更新", "讨论", "调研", "测试", "修复", "部署"]
+_OBJECTS = ["项目A设计文档", "周报", "客户邮件", "季度规划", "接口文档", "竞品分析", "测试用例",
+            "线上问题", "发布说明", "预算表", "招聘需求", "培训材料", "数据看板", "会议纪要"]
+_LOCATIONS = [None, None, None, "大会议室", "三号会议室", "线上", "客户公司", "咖啡厅"]
+_PRIORITIES = ["High", "Medium", "Medium", "Low"]
+_DURATIONS = [15, 30, 45, 60, 90, 120, 180]
+_WEIGHTS = {'fixed': 0.35, 'flexible': 0.35, 'tree': 0.30}
+
+INSERT_SQL = """
+INSERT INTO tasks (id, task_name, start_time, end_time, duration_minutes, priority, status, details, location, parent_task_id, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+
+def _task_name(rng):
+    return f"{rng.choice(_VERBS)}{rng.choice(_OBJECTS)}"
+
+def _created_at(rng, day):
+    created = datetime.datetime.combine(day, datetime.time(8)) - datetime.timedelta(days=rng.randint(0, 14), minutes=rng.randint(0, 600))
+    return created.strftime('%Y-%m-%d %H:%M:%S')
+
+def _fixed_event(rng, task_id, base_date):
+    day = base_date + datetime.timedelta(days=rng.randint(-180, 30))
+    start = datetime.datetime.combine(day, datetime.time(rng.randint(8, 19), rng.choice((0, 15, 30, 45))))
+    duration = rng.choice(_DURATIONS)
+    end = start + datetime.timedelta(minutes=duration)
+    status = 'completed' if day < base_date and rng.random() < 0.8 else 'pending'
+    return (task_id, _task_name(rng), start.strftime('%Y-%m-%dT%H:%M:%S'), end.strftime('%Y-%m-%dT%H:%M:%S'),
+            duration, rng.choice(_PRIORITIES), status, None, rng.choice(_LOCATIONS), None, _created_at(rng, day))
+
+def _flexible_task(rng, task_id, base_date):
+    status = 'completed' if rng.random() < 0.3 else 'pending'
+    details = "需要和相关同事确认细节" if rng.random() < 0.2 else None
+    return (task_id, _task_name(rng), None, None, rng.choice(_DURATIONS), rng.choice(_PRIORITIES), status,
+            details, None, None, _created_at(rng, base_date))
+
+def _task_tree(rng, task_id, base_date):
+    parent_status = 'completed' if rng.random() < 0.3 else 'pending'
+    rows = [(task_id, _task_name(rng), None, None, rng.randint(120, 600), rng.choice(_PRIORITIES), parent_status,
+             "由智能分解生成子任务", None, None, _created_at(rng, base_date))]
+    for offset in range(1, rng.randint(3, 7) + 1):
+        status = 'completed' if parent_status == 'completed' or rng.random() < 0.4 else 'pending'
+        rows.append((task_id + offset, _task_name(rng), None, None, rng.choice(_DURATIONS), rng.choice(_PRIORITIES),
+                     status, None, None, task_id, _created_at(rng, base_date)))
+    return rows
+
+def iter_task_rows(total_tasks: int, seed: int = 42, first_id: int = 1, base_date: datetime.date = BASE_DATE):
+    """按顺序产出任务行；同样的参数总是产出同样的数据"""
+    rng = random.Random(seed)
+    kinds, weights = zip(*_WEIGHTS.items())
+    task_id = first_id
+    produced = 0
+    while produced < total_tasks:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == 'fixed':
+            rows = [_fixed_event(rng, task_id, base_date)]
+        elif kind == 'flexible':
+            rows = [_flexible_task(rng, task_id, base_date)]
+        else:
+            rows = _task_tree(rng, task_id, base_date)
+        rows = rows[:total_tasks - produced]
+        for row in rows:
+            yield row
+        task_id += len(rows)
+        produced += len(rows)
+
+def _series_rows(count: int, seed: int, base_date: datetime.date):
+    rng = random.Random(seed + 1)
+    for _ in range(count):
+        freq = rng.choice(("DAILY", "WEEKLY", "WEEKLY", "MONTHLY"))
+        has_clock = rng.random() < 0.8
+        yield (
+            f"例行{rng.choice(_OBJECTS)}", (base_date - datetime.timedelta(days=rng.randint(0, 365))).isoformat(),
+            f"{rng.randint(8, 18):02d}:{rng.choice((0, 30)):02d}:00" if has_clock else None,
+            rng.choice((15, 30, 60)), rng.choice(_PRIORITIES), freq, rng.choice((1, 1, 2)),
+            str(rng.randint(0, 4)) if freq == "WEEKLY" else None,
+        )
+
+def generate_database(db_path: str = DEFAULT_BENCH_DB, total_tasks: int = 10000, seed: int = 42,
+                      series_count: int = None, reset: bool = True, base_date: datetime.date = BASE_DATE):
+    """生成测试数据库，返回写入的任务数量"""
+    if reset and os.path.exists(db_path):
+        os.remove(db_path)
+    original_path = database_manager.DB_PATH
+    database_manager.DB_PATH = db_path
+    try:
+        database_manager.init_db()
+    finally:
+        database_manager.DB_PATH = original_path
+    if series_count is None:
+        series_count = max(1, total_tasks // 2000)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA synchronous = OFF;")
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM tasks;")
+        first_id = cursor.fetchone()[0]
+        chunk = []
+        written = 0
+        for row in iter_task_rows(total_tasks, seed, first_id, base_date):
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                cursor.executemany(INSERT_SQL, chunk)
+                conn.commit()
+                written += len(chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(INSERT_SQL, chunk)
+            written += len(chunk)
+        cursor.executemany("""
+        INSERT INTO recurring_series (task_name, start_date, start_clock, duration_minutes, priority, freq, interval, by_weekday)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """, _series_rows(series_count, seed, base_date))
+        conn.commit()
+        cursor.execute("ANALYZE;")
+    print(f"[*] 已向 {db_path} 写入 {written} 个任务和 {series_count} 个重复任务系列 (seed={seed})。")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成可复现的大规模任务数据")
+    parser.add_argument("tasks", nargs="?", type=int, default=10000, help="任务数量（默认 10000）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=DEFAULT_BENCH_DB, help="输出数据库路径（默认 tasky_bench.db）")
+    parser.add_argument("--series", type=int, default=None, help="重复任务系列数量（默认 任务数/2000）")
+    args = parser.parse_args()
+    generate_database(args.db, args.tasks, args.seed, args.series)
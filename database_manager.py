@@ -1,14 +1,35 @@
-# database_manager.py (V1.5 - 新增 update_task_details)
+# database_manager.py (V2.1 - 新增空闲时间位图缓存)
 
 import sqlite3
 import json
 import datetime
 import os
+from task_model import Task, TaskBatch, task_row_factory
+import task_recurrence
 
 # --- 定义数据库文件的绝对路径 ---
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(_CURRENT_DIR, 'tasky.db')
 
+# --- 日程变更监听 (提醒服务等模块通过它感知变化，而不必反复扫描全表) ---
+_schedule_listeners = []
+
+def add_schedule_listener(listener):
+    """注册回调 listener(task_id, start_time)；start_time 为 None 表示该任务不再占用时间"""
+    if listener not in _schedule_listeners:
+        _schedule_listeners.append(listener)
+
+def remove_schedule_listener(listener):
+    if listener in _schedule_listeners:
+        _schedule_listeners.remove(listener)
+
+def _notify_schedule_change(task_id, start_time):
+    for listener in list(_schedule_listeners):
+        try:
+            listener(task_id, start_time)
+        except Exception as e:
+            print(f"❌ 日程变更回调执行失败: {e}")
+
 def init_db():
     """连接数据库并创建任务表（如果不存在的话）"""
     with sqlite3.connect(DB_PATH) as conn:
@@ -29,6 +50,97 @@ def init_db():
         );
         """
         cursor.execute(create_table_sql)
+        # 索引：支撑分页查询和按日期过滤，避免每次全表扫描
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_parent_status ON tasks (parent_task_id, status);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_start_time ON tasks (start_time);")
+        # 重复任务：每个系列只存一行规则，单次发生的例外稀疏存储
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recurring_series (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_name TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            start_clock TEXT,
+            duration_minutes INTEGER,
+            priority TEXT NOT NULL DEFAULT 'Medium',
+            details TEXT,
+            location TEXT,
+            freq TEXT NOT NULL,
+            interval INTEGER NOT NULL DEFAULT 1,
+            by_weekday TEXT,
+            until_date TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recurrence_exceptions (
+            series_id INTEGER NOT NULL,
+            occurrence_date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            start_time TEXT,
+            end_time TEXT,
+            PRIMARY KEY (series_id, occurrence_date)
+        );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_series_range ON recurring_series (start_date, until_date);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_exceptions_start_time ON recurrence_exceptions (start_time);")
+        # 每天的占用位图缓存 (见 task_availability)，日程变化时由触发器删掉受影响的日期
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS availability_days (
+            day TEXT PRIMARY KEY,
+            busy BLOB NOT NULL,
+            busy_minutes INTEGER NOT NULL
+        );
+        """)
+        # 旧版本的触发器只按开始日期失效，缓存的位图也没有计入跨零点的部分，升级时一并替换
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_availability_task_insert';")
+        old_trigger = cursor.fetchone()
+        if old_trigger and 'end_time' not in old_trigger[0]:
+            cursor.executescript("""
+            DROP TRIGGER trg_availability_task_insert;
+            DROP TRIGGER IF EXISTS trg_availability_task_update;
+            DROP TRIGGER IF EXISTS trg_availability_task_delete;
+            DROP TRIGGER IF EXISTS trg_availability_exception_insert;
+            DROP TRIGGER IF EXISTS trg_availability_exception_update;
+            DROP TRIGGER IF EXISTS trg_availability_exception_delete;
+            DELETE FROM availability_days;
+            """)
+        # 受影响的是从开始日期到结束日期的每一天；只有时长没有结束时间时，多失效一天以覆盖跨零点的部分
+        old_days = "day BETWEEN substr(OLD.start_time, 1, 10) AND COALESCE(substr(OLD.end_time, 1, 10), date(substr(OLD.start_time, 1, 10), '+1 day'))"
+        new_days = old_days.replace('OLD.', 'NEW.')
+        cursor.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_availability_task_insert AFTER INSERT ON tasks
+        WHEN NEW.start_time IS NOT NULL BEGIN
+            DELETE FROM availability_days WHERE {new_days};
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_task_update AFTER UPDATE OF start_time, end_time, duration_minutes, status ON tasks
+        WHEN OLD.start_time IS NOT NULL OR NEW.start_time IS NOT NULL BEGIN
+            DELETE FROM availability_days WHERE {old_days} OR {new_days};
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_task_delete AFTER DELETE ON tasks
+        WHEN OLD.start_time IS NOT NULL BEGIN
+            DELETE FROM availability_days WHERE {old_days};
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_exception_insert AFTER INSERT ON recurrence_exceptions BEGIN
+            DELETE FROM availability_days WHERE day IN (NEW.occurrence_date, date(NEW.occurrence_date, '+1 day')) OR {new_days};
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_exception_update AFTER UPDATE ON recurrence_exceptions BEGIN
+            DELETE FROM availability_days WHERE day IN (OLD.occurrence_date, date(OLD.occurrence_date, '+1 day'),
+                                                        NEW.occurrence_date, date(NEW.occurrence_date, '+1 day'))
+                OR {old_days} OR {new_days};
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_exception_delete AFTER DELETE ON recurrence_exceptions BEGIN
+            DELETE FROM availability_days WHERE day IN (OLD.occurrence_date, date(OLD.occurrence_date, '+1 day')) OR {old_days};
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_series_insert AFTER INSERT ON recurring_series BEGIN
+            DELETE FROM availability_days;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_series_update AFTER UPDATE ON recurring_series BEGIN
+            DELETE FROM availability_days;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_availability_series_delete AFTER DELETE ON recurring_series BEGIN
+            DELETE FROM availability_days;
+        END;
+        """)
     print("数据库'tasky.db'已初始化，任务表'tasks'已准备就绪。")
 
 def add_task_from_dify(dify_json_output):
@@ -39,8 +151,9 @@ def add_task_from_dify(dify_json_output):
             
             # --- 优化：正确处理嵌套的task_details对象 ---
             task_details_obj = dify_json_output.get('task_details', {}) or {}
-            details_text = task_details_obj.get('description')
-            location_text = task_details_obj.get('location')
+            # task_parser 返回的是扁平的 details / location 字段
+            details_text = task_details_obj.get('description') or dify_json_output.get('details')
+            location_text = task_details_obj.get('location') or dify_json_output.get('location')
 
             insert_sql = """
             INSERT INTO tasks (task_name, start_time, end_time, duration_minutes, priority, details, location)
@@ -58,6 +171,8 @@ def add_task_from_dify(dify_json_output):
             cursor.execute(insert_sql, task_data)
             new_task_id = cursor.lastrowid
         
+        if dify_json_output.get('start_time'):
+            _notify_schedule_change(new_task_id, dify_json_output.get('start_time'))
         print(f"成功添加主任务: '{dify_json_output.get('task_name')}' (ID: {new_task_id})")
         return new_task_id
     except Exception as e:
@@ -86,16 +201,19 @@ def add_subtasks(parent_id: int, subtasks_list: list):
 def get_all_tasks():
     try:
         with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM tasks;")
-            tasks = cursor.fetchall()
-            return [dict(row) for row in tasks]
+            return TaskBatch.from_cursor(cursor)
     except Exception as e:
         print(f"❌ 查询所有任务失败: {e}")
-        return []
+        return TaskBatch.empty()
 
 def update_task_status(task_id: int, status: str):
+    occurrence = task_recurrence.parse_occurrence_key(task_id)
+    if occurrence:
+        if status == 'completed':
+            return set_occurrence_exception(*occurrence, 'completed', keep_times=True)
+        return reopen_occurrence(*occurrence)
     try:
         with sqlite3.connect(DB_PATH) as conn:
             cursor = conn.cursor()
@@ -153,40 +271,56 @@ def update_task_content(task_id: int, new_name: str, new_details: str, new_prior
         return False
 
 def delete_task(task_id: int):
+    occurrence = task_recurrence.parse_occurrence_key(task_id)
+    if occurrence:
+        # 删除单次发生只记录一个“取消”例外，不影响整个系列
+        return set_occurrence_exception(*occurrence, 'cancelled')
     try:
         with sqlite3.connect(DB_PATH) as conn:
             cursor = conn.cursor()
             delete_sql = "DELETE FROM tasks WHERE id = ? OR parent_task_id = ?;"
             cursor.execute(delete_sql, (task_id, task_id))
+        _notify_schedule_change(task_id, None)
         return True
     except Exception as e:
         print(f"❌ 删除任务ID {task_id} 失败: {e}")
         return False
 
 def get_fixed_events(target_date: str):
+    """查询指定日期的固定事件，包括按需展开的重复任务"""
+    day_start, day_end = _date_range(target_date)
     with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+        conn.row_factory = task_row_factory
         cursor = conn.cursor()
-        query_sql = "SELECT task_name, start_time, end_time FROM tasks WHERE start_time IS NOT NULL AND DATE(start_time) = ?;"
-        cursor.execute(query_sql, (target_date,))
+        query_sql = "SELECT task_name, start_time, end_time FROM tasks WHERE start_time >= ? AND start_time < ?;"
+        cursor.execute(query_sql, (day_start, day_end))
         events = cursor.fetchall()
-        return [dict(row) for row in events]
+    events += [o for o in get_occurrences(target_date, target_date) if o.start_time]
+    return events
 
-def get_flexible_tasks():
+def get_flexible_tasks(target_date: str = None):
+    """查询灵活任务。给出 target_date 时，同时展开当天没有固定时刻的重复任务。"""
     with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+        conn.row_factory = task_row_factory
         cursor = conn.cursor()
-        query_sql = "SELECT id, task_name, duration_minutes, priority FROM tasks WHERE start_time IS NULL AND parent_task_id IS NULL;"
+        query_sql = "SELECT id, task_name, duration_minutes, priority, status FROM tasks WHERE start_time IS NULL AND parent_task_id IS NULL;"
         cursor.execute(query_sql)
         tasks = cursor.fetchall()
-        return [dict(row) for row in tasks]
+    tasks += get_postponed_occurrences()
+    if target_date:
+        tasks += [o for o in get_occurrences(target_date, target_date) if not o.start_time and o.status == 'pending']
+    return tasks
 
 def update_task_schedule(task_id: int, start_time: str, end_time: str):
+    occurrence = task_recurrence.parse_occurrence_key(task_id)
+    if occurrence:
+        return set_occurrence_exception(*occurrence, 'edited', start_time, end_time)
     try:
         with sqlite3.connect(DB_PATH) as conn:
             cursor = conn.cursor()
             update_sql = "UPDATE tasks SET start_time = ?, end_time = ? WHERE id = ?;"
             cursor.execute(update_sql, (start_time, end_time, task_id))
+        _notify_schedule_change(task_id, start_time)
         return True
     except Exception as e:
         print(f"❌ 更新任务ID {task_id} 的日程失败: {e}")
@@ -194,14 +328,509 @@ def update_task_schedule(task_id: int, start_time: str, end_time: str):
 
 def postpone_task(task_id: int):
     """将任务顺延，通过清空其开始和结束时间使其变为灵活任务。"""
+    occurrence = task_recurrence.parse_occurrence_key(task_id)
+    if occurrence:
+        return set_occurrence_exception(*occurrence, 'postponed')
     try:
         with sqlite3.connect(DB_PATH) as conn:
             cursor = conn.cursor()
             update_sql = "UPDATE tasks SET start_time = NULL, end_time = NULL WHERE id = ?;"
             cursor.execute(update_sql, (task_id,))
+        _notify_schedule_change(task_id, None)
         print(f"[*] 成功顺延任务ID {task_id}。")
         return True
     except Exception as e:
         print(f"❌ 顺延任务ID {task_id} 失败: {e}")
         return False
 
+
+
+# --- 分页与过滤查询 (供界面按需加载使用) ---
+
+def _date_range(target_date: str):
+    """把 "YYYY-MM-DD" 转换成 [当天, 次日) 的字符串区间，便于走 start_time 索引"""
+    day = datetime.date.fromisoformat(target_date)
+    return day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()
+
+def _build_parent_filters(status=None, target_date=None, priority=None):
+    """拼接父任务查询的 WHERE 子句和参数"""
+    clauses = ["parent_task_id IS NULL"]
+    params = []
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if target_date:
+        day_start, day_end = _date_range(target_date)
+        clauses.append("start_time >= ? AND start_time < ?")
+        params.extend([day_start, day_end])
+    if priority:
+        clauses.append("priority = ?")
+        params.append(priority)
+    return " AND ".join(clauses), params
+
+def count_parent_tasks(status=None, target_date=None, priority=None):
+    """统计满足过滤条件的父任务数量"""
+    where_sql, params = _build_parent_filters(status, target_date, priority)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM tasks WHERE {where_sql};", params)
+            return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"❌ 统计任务数量失败: {e}")
+        return 0
+
+def get_parent_tasks_page(status=None, target_date=None, priority=None, limit: int = 20, offset: int = 0):
+    """按过滤条件分页查询父任务"""
+    where_sql, params = _build_parent_filters(status, target_date, priority)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = task_row_factory
+            cursor = conn.cursor()
+            query_sql = f"SELECT * FROM tasks WHERE {where_sql} ORDER BY id LIMIT ? OFFSET ?;"
+            cursor.execute(query_sql, params + [limit, offset])
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"❌ 分页查询任务失败: {e}")
+        return []
+
+def get_child_tasks(parent_ids: list, status=None):
+    """只查询给定父任务下的子任务，而不是整张表"""
+    if not parent_ids: return []
+    placeholders = ", ".join("?" for _ in parent_ids)
+    query_sql = f"SELECT * FROM tasks WHERE parent_task_id IN ({placeholders})"
+    params = list(parent_ids)
+    if status:
+        query_sql += " AND status = ?"
+        params.append(status)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = task_row_factory
+            cursor = conn.cursor()
+            cursor.execute(query_sql + " ORDER BY id;", params)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"❌ 查询子任务失败: {e}")
+        return []
+
+# 有已完成内容的任务组：父任务本身已完成，或有已完成的子任务
+_COMPLETED_GROUP_SQL = (
+    "(status = 'completed' OR EXISTS (SELECT 1 FROM tasks AS child "
+    "WHERE child.parent_task_id = tasks.id AND child.status = 'completed'))"
+)
+
+def count_completed_groups(target_date=None, priority=None):
+    """统计包含已完成内容、且父任务满足过滤条件的任务组数量"""
+    where_sql, params = _build_parent_filters(None, target_date, priority)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM tasks WHERE {where_sql} AND {_COMPLETED_GROUP_SQL};", params)
+            return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"❌ 统计已完成任务失败: {e}")
+        return 0
+
+def get_completed_groups_page(limit: int = 20, offset: int = 0, target_date=None, priority=None):
+    """分页查询已完成任务组，返回 (父任务列表, 已完成子任务列表)"""
+    where_sql, params = _build_parent_filters(None, target_date, priority)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = task_row_factory
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT * FROM tasks WHERE {where_sql} AND {_COMPLETED_GROUP_SQL} ORDER BY id LIMIT ? OFFSET ?;",
+                params + [limit, offset]
+            )
+            parents = cursor.fetchall()
+            if not parents: return [], []
+            group_ids = [parent['id'] for parent in parents]
+            placeholders = ", ".join("?" for _ in group_ids)
+            cursor.execute(
+                f"SELECT * FROM tasks WHERE parent_task_id IN ({placeholders}) AND status = 'completed' ORDER BY id;",
+                group_ids
+            )
+            children = cursor.fetchall()
+            return parents, children
+    except Exception as e:
+        print(f"❌ 分页查询已完成任务失败: {e}")
+        return [], []
+
+# --- 增量重排所需的查询与批量更新 ---
+
+def get_task(task_id: int):
+    """按ID查询单个任务，不存在时返回None；也接受重复任务单次发生的ID"""
+    occurrence = task_recurrence.parse_occurrence_key(task_id)
+    if occurrence:
+        return get_occurrence(*occurrence)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = task_row_factory
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM tasks WHERE id = ?;", (task_id,))
+            row = cursor.fetchone()
+            return row
+    except Exception as e:
+        print(f"❌ 查询任务ID {task_id} 失败: {e}")
+        return None
+
+def get_scheduled_tasks(target_date: str, status: str = 'pending'):
+    """查询指定日期内已安排时间的任务（带ID和时长），按开始时间排序"""
+    day_start, day_end = _date_range(target_date)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = task_row_factory
+            cursor = conn.cursor()
+            query_sql = """
+            SELECT id, task_name, start_time, end_time, duration_minutes, priority, status
+            FROM tasks WHERE start_time >= ? AND start_time < ? AND status = ?
+            ORDER BY start_time;
+            """
+            cursor.execute(query_sql, (day_start, day_end, status))
+            tasks = cursor.fetchall()
+    except Exception as e:
+        print(f"❌ 查询 {target_date} 的日程失败: {e}")
+        return []
+    # 重复任务的单次发生同样占用时间
+    tasks += [o for o in get_occurrences(target_date, target_date) if o.start_time and o.status == status]
+    return sorted(tasks, key=lambda t: t.start_time)
+
+def update_task_duration(task_id: int, duration_minutes: int):
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            update_sql = "UPDATE tasks SET duration_minutes = ? WHERE id = ?;"
+            cursor.execute(update_sql, (duration_minutes, task_id))
+        return True
+    except Exception as e:
+        print(f"❌ 更新任务ID {task_id} 的时长失败: {e}")
+        return False
+
+def update_task_schedules(schedule_updates: list):
+    """在一个事务里批量更新多个任务的日程，schedule_updates 为 (task_id, start_time, end_time) 列表"""
+    if not schedule_updates: return True
+    occurrence_updates = [u for u in schedule_updates if task_recurrence.parse_occurrence_key(u[0])]
+    for task_id, start, end in occurrence_updates:
+        update_task_schedule(task_id, start, end)
+    schedule_updates = [u for u in schedule_updates if u not in occurrence_updates]
+    if not schedule_updates: return True
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            update_sql = "UPDATE tasks SET start_time = ?, end_time = ? WHERE id = ?;"
+            cursor.executemany(update_sql, [(start, end, task_id) for task_id, start, end in schedule_updates])
+        for task_id, start, _ in schedule_updates:
+            _notify_schedule_change(task_id, start)
+        return True
+    except Exception as e:
+        print(f"❌ 批量更新日程失败: {e}")
+        return False
+
+def get_upcoming_tasks(window_start: str, window_end: str):
+    """查询 [window_start, window_end) 内开始的待办任务（含重复任务的单次发生），走 start_time 索引做范围查询"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = task_row_factory
+            cursor = conn.cursor()
+            query_sql = """
+            SELECT id, task_name, start_time, end_time, location, status
+            FROM tasks WHERE start_time >= ? AND start_time < ? AND status = 'pending'
+            ORDER BY start_time;
+            """
+            cursor.execute(query_sql, (window_start, window_end))
+            tasks = cursor.fetchall()
+    except Exception as e:
+        print(f"❌ 查询即将开始的任务失败: {e}")
+        return []
+    tasks += [
+        o for o in get_occurrences(window_start[:10], window_end[:10])
+        if o.start_time and o.status == 'pending' and window_start <= o.start_time < window_end
+    ]
+    return sorted(tasks, key=lambda t: t.start_time)
+
+def get_decomposed_parents(after_child_id: int = 0):
+    """查询自 after_child_id 之后新增过子任务的父任务，返回 (父任务列表, 本次看到的最大子任务ID)"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(id) FROM tasks WHERE parent_task_id IS NOT NULL;")
+            max_child_id = cursor.fetchone()[0] or after_child_id
+            cursor.row_factory = task_row_factory
+            query_sql = """
+            SELECT id, task_name, details FROM tasks
+            WHERE id IN (SELECT DISTINCT parent_task_id FROM tasks WHERE parent_task_id IS NOT NULL AND id > ? AND id <= ?);
+            """
+            cursor.execute(query_sql, (after_child_id, max_child_id))
+            return cursor.fetchall(), max_child_id
+    except Exception as e:
+        print(f"❌ 查询已分解任务失败: {e}")
+        return [], after_child_id
+
+def get_subtask_templates(parent_id: int):
+    """取出某个父任务的子任务拆分，字段与 task_decomposer.decompose_task 的返回一致"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT task_name, duration_minutes, priority FROM tasks WHERE parent_task_id = ? ORDER BY id;",
+                (parent_id,)
+            )
+            return [
+                {"task_name": name, "duration_minutes": duration, "priority": priority}
+                for name, duration, priority in cursor.fetchall()
+            ]
+    except Exception as e:
+        print(f"❌ 查询任务ID {parent_id} 的子任务失败: {e}")
+        return []
+
+
+# --- 重复任务系列 ---
+
+def add_recurring_series(series_json: dict):
+    """
+    新增一个重复任务系列，返回系列ID。
+
+    series_json 字段：task_name, start_time（首次发生的ISO时间，不填则为没有固定时刻的系列）
+    或 start_date, duration_minutes, priority, details, location,
+    freq ('DAILY'/'WEEKLY'/'MONTHLY'), interval, by_weekday (如 "0,2,4"，周一为0), until_date
+    """
+    freq = (series_json.get('freq') or '').upper()
+    if freq not in task_recurrence.FREQUENCIES:
+        print(f"❌ 添加重复任务失败：不支持的频率 {series_json.get('freq')}")
+        return None
+    start_time = series_json.get('start_time')
+    if start_time:
+        start_dt = datetime.datetime.fromisoformat(start_time)
+        start_date, start_clock = start_dt.date().isoformat(), start_dt.time().strftime('%H:%M:%S')
+    else:
+        start_date, start_clock = series_json.get('start_date'), None
+    by_weekday = series_json.get('by_weekday')
+    if isinstance(by_weekday, (list, tuple)):
+        by_weekday = ",".join(str(day) for day in by_weekday)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            insert_sql = """
+            INSERT INTO recurring_series (task_name, start_date, start_clock, duration_minutes, priority, details, location,
+                                          freq, interval, by_weekday, until_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """
+            cursor.execute(insert_sql, (
+                series_json.get('task_name'), start_date, start_clock, series_json.get('duration_minutes'),
+                series_json.get('priority') or 'Medium', series_json.get('details'), series_json.get('location'),
+                freq, series_json.get('interval') or 1, by_weekday, series_json.get('until_date')
+            ))
+            series_id = cursor.lastrowid
+        print(f"成功添加重复任务: '{series_json.get('task_name')}' (系列ID: {series_id})")
+        return series_id
+    except Exception as e:
+        print(f"❌ 添加重复任务失败: {e}")
+        return None
+
+def delete_recurring_series(series_id: int):
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM recurrence_exceptions WHERE series_id = ?;", (series_id,))
+            cursor.execute("DELETE FROM recurring_series WHERE id = ?;", (series_id,))
+        return True
+    except Exception as e:
+        print(f"❌ 删除重复任务系列 {series_id} 失败: {e}")
+        return False
+
+def set_occurrence_exception(series_id: int, occurrence_date: str, status: str,
+                             start_time: str = None, end_time: str = None, keep_times: bool = False):
+    """记录单次发生的例外；keep_times 为 True 时保留之前改过的时间（用于标记完成）"""
+    if status not in task_recurrence.EXCEPTION_STATUSES:
+        print(f"❌ 无效的例外状态: {status}")
+        return False
+    times_sql = "start_time = COALESCE(excluded.start_time, start_time), end_time = COALESCE(excluded.end_time, end_time)" \
+        if keep_times else "start_time = excluded.start_time, end_time = excluded.end_time"
+    # 只改时间（例如提前完成后记录实际结束时间）时，不覆盖已完成的状态
+    status_sql = "CASE WHEN status = 'completed' THEN status ELSE excluded.status END" \
+        if status == 'edited' else "excluded.status"
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            upsert_sql = f"""
+            INSERT INTO recurrence_exceptions (series_id, occurrence_date, status, start_time, end_time)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (series_id, occurrence_date) DO UPDATE SET status = {status_sql}, {times_sql};
+            """
+            cursor.execute(upsert_sql, (series_id, occurrence_date, status, start_time, end_time))
+        _notify_schedule_change(task_recurrence.occurrence_key(series_id, occurrence_date),
+                                start_time if status == 'edited' else None)
+        return True
+    except Exception as e:
+        print(f"❌ 记录重复任务 {series_id} 在 {occurrence_date} 的例外失败: {e}")
+        return False
+
+def clear_occurrence_exception(series_id: int, occurrence_date: str):
+    """删除单次发生的例外，恢复为系列的默认安排"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM recurrence_exceptions WHERE series_id = ? AND occurrence_date = ?;",
+                           (series_id, occurrence_date))
+        return True
+    except Exception as e:
+        print(f"❌ 清除重复任务 {series_id} 在 {occurrence_date} 的例外失败: {e}")
+        return False
+
+def reopen_occurrence(series_id: int, occurrence_date: str):
+    """把单次发生恢复为待办：改过时间的保留为 'edited'，否则删除例外，回到系列的默认安排"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE recurrence_exceptions SET status = 'edited' "
+                "WHERE series_id = ? AND occurrence_date = ? AND start_time IS NOT NULL;",
+                (series_id, occurrence_date)
+            )
+            cursor.execute(
+                "DELETE FROM recurrence_exceptions WHERE series_id = ? AND occurrence_date = ? AND start_time IS NULL;",
+                (series_id, occurrence_date)
+            )
+            cursor.execute(
+                "SELECT start_time FROM recurrence_exceptions WHERE series_id = ? AND occurrence_date = ?;",
+                (series_id, occurrence_date)
+            )
+            row = cursor.fetchone()
+        if row:
+            start_time = row[0]
+        else:
+            series = get_recurring_series(series_id)
+            start_time = task_recurrence.occurrence_times(series, occurrence_date)[0] if series else None
+        _notify_schedule_change(task_recurrence.occurrence_key(series_id, occurrence_date), start_time)
+        return True
+    except Exception as e:
+        print(f"❌ 恢复重复任务 {series_id} 在 {occurrence_date} 的发生失败: {e}")
+        return False
+
+def get_recurring_series(series_id: int):
+    """按ID查询重复任务系列，不存在时返回None"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            return conn.execute("SELECT * FROM recurring_series WHERE id = ?;", (series_id,)).fetchone()
+    except Exception as e:
+        print(f"❌ 查询重复任务系列 {series_id} 失败: {e}")
+        return None
+
+def get_occurrence(series_id: int, occurrence_date: str):
+    """查询单次发生（叠加例外后），日期不属于该系列或已被取消时返回None"""
+    series = get_recurring_series(series_id)
+    if not series or occurrence_date not in task_recurrence.expand_dates(series, occurrence_date, occurrence_date):
+        return None
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            exception = conn.execute(
+                "SELECT * FROM recurrence_exceptions WHERE series_id = ? AND occurrence_date = ?;",
+                (series_id, occurrence_date)
+            ).fetchone()
+    except Exception as e:
+        print(f"❌ 查询重复任务 {series_id} 在 {occurrence_date} 的发生失败: {e}")
+        return None
+    if exception and exception['status'] == 'cancelled':
+        return None
+    return _occurrence_task(series, occurrence_date, exception)
+
+def list_recurring_series():
+    """列出全部重复任务系列（供界面管理）"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            return conn.execute("SELECT * FROM recurring_series ORDER BY id;").fetchall()
+    except Exception as e:
+        print(f"❌ 查询重复任务系列失败: {e}")
+        return []
+
+def _occurrence_task(series, occurrence_date, exception=None):
+    """把系列的一次发生（叠加例外后）表示为 Task，ID 为 task_recurrence.occurrence_key"""
+    start_time, end_time = task_recurrence.occurrence_times(series, occurrence_date)
+    status = 'pending'
+    if exception:
+        if exception['status'] == 'postponed':
+            start_time, end_time = None, None
+        elif exception['start_time']:
+            start_time, end_time = exception['start_time'], exception['end_time']
+        if exception['status'] == 'completed':
+            status = 'completed'
+    return Task(
+        id=task_recurrence.occurrence_key(series['id'], occurrence_date),
+        task_name=series['task_name'], start_time=start_time, end_time=end_time,
+        duration_minutes=series['duration_minutes'], priority=series['priority'], status=status,
+        details=series['details'], location=series['location'],
+    )
+
+def get_occurrences(range_start: str, range_end: str):
+    """
+    展开 [range_start, range_end]（含两端，"YYYY-MM-DD"）内的重复任务，按生效日期返回 Task 列表。
+    被取消或顺延的发生不会出现；被改期到该范围内的发生会出现。
+    """
+    time_start, _ = _date_range(range_start)
+    _, time_end = _date_range(range_end)
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM recurring_series WHERE start_date <= ? AND (until_date IS NULL OR until_date >= ?);",
+                (range_end, range_start)
+            )
+            series_by_id = {row['id']: row for row in cursor.fetchall()}
+            cursor.execute(
+                "SELECT * FROM recurrence_exceptions WHERE (occurrence_date >= ? AND occurrence_date <= ?) "
+                "OR (start_time >= ? AND start_time < ?);",
+                (range_start, range_end, time_start, time_end)
+            )
+            exceptions = {(row['series_id'], row['occurrence_date']): row for row in cursor.fetchall()}
+            missing_ids = {series_id for series_id, _ in exceptions} - set(series_by_id)
+            if missing_ids:
+                placeholders = ", ".join("?" for _ in missing_ids)
+                cursor.execute(f"SELECT * FROM recurring_series WHERE id IN ({placeholders});", list(missing_ids))
+                series_by_id.update({row['id']: row for row in cursor.fetchall()})
+    except Exception as e:
+        print(f"❌ 展开重复任务失败: {e}")
+        return []
+
+    occurrences = []
+    seen = set()
+    for series in series_by_id.values():
+        for occurrence_date in task_recurrence.expand_dates(series, range_start, range_end):
+            seen.add((series['id'], occurrence_date))
+            exception = exceptions.get((series['id'], occurrence_date))
+            if exception and exception['status'] == 'cancelled':
+                continue
+            task = _occurrence_task(series, occurrence_date, exception)
+            if task.start_time and not (time_start <= task.start_time < time_end):
+                continue  # 已被改期到范围之外
+            if exception and exception['status'] == 'postponed':
+                continue
+            occurrences.append(task)
+    # 从范围外改期进来的发生
+    for (series_id, occurrence_date), exception in exceptions.items():
+        if (series_id, occurrence_date) in seen or series_id not in series_by_id:
+            continue
+        if exception['status'] in ('edited', 'completed') and exception['start_time'] \
+                and time_start <= exception['start_time'] < time_end:
+            occurrences.append(_occurrence_task(series_by_id[series_id], occurrence_date, exception))
+    return occurrences
+
+def get_postponed_occurrences():
+    """被顺延、尚未重新安排的重复任务发生，作为灵活任务参与排程"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT s.*, e.occurrence_date FROM recurrence_exceptions e
+            JOIN recurring_series s ON s.id = e.series_id
+            WHERE e.status = 'postponed';
+            """)
+            postponed = {'status': 'postponed', 'start_time': None, 'end_time': None}
+            return [_occurrence_task(row, row['occurrence_date'], postponed) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"❌ 查询顺延的重复任务失败: {e}")
+        return []
@@ -0,0 +1,218 @@
+# db_benchmark.py (V1 - 数据库基准测试)
+"""
+数据库基准测试
+
+先用 data_generator 生成指定规模的数据库，再对 database_manager 的每个函数、
+task_availability 的空闲时间查询，以及任务列表渲染所需的分组查询，分别测量耗时（平均 / p50 / p95）和峰值内存。
+运行结束会列出没有被覆盖到的 database_manager 函数，新增函数时记得补上用例。
+
+用法: python db_benchmark.py [--tasks 10000] [--repeat 10] [--db tasky_bench.db] [--no-generate]
+"""
+
+import argparse
+import contextlib
+import datetime
+import os
+import sqlite3
+import statistics
+import time
+import tracemalloc
+import database_manager
+import data_generator
+import task_availability
+
+TARGET_DATE = data_generator.BASE_DATE.isoformat()
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# 只涉及内存中回调注册、不访问数据库的函数
+NOT_BENCHMARKED = {'add_schedule_listener', 'remove_schedule_listener'}
+
+
+def _args(*args):
+    """固定参数的准备函数"""
+    return lambda: args
+
+def _first_id(sql, params=()):
+    with sqlite3.connect(database_manager.DB_PATH) as conn:
+        row = conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+
+def _refresh_tasks_first_page():
+    """界面首屏的数据路径：待办分页 + 子任务 + 展开后的已完成分页"""
+    database_manager.count_parent_tasks('pending')
+    parents = database_manager.get_parent_tasks_page('pending', limit=20)
+    database_manager.get_child_tasks([t['id'] for t in parents])
+    database_manager.count_completed_groups()
+    database_manager.get_completed_groups_page(limit=20)
+
+def _refresh_tasks_full_grouping():
+    """整表读取并在 Python 中分组，作为分页方案的对照"""
+    all_tasks = database_manager.get_all_tasks()
+    children_by_parent = {}
+    parent_ids = all_tasks.column('parent_task_id')
+    for index, parent_id in enumerate(parent_ids):
+        if parent_id is not None:
+            children_by_parent.setdefault(parent_id, []).append(index)
+    statuses = all_tasks.column('status')
+    pending_parents = [i for i, p in enumerate(parent_ids) if p is None and statuses[i] == 'pending']
+    return len(pending_parents), len(children_by_parent)
+
+
+def build_cases():
+    """
+    返回基准用例列表。每个用例是 (名称, 被测函数, 准备参数的函数, 收尾函数)；
+    准备和收尾不计入耗时，用来保证写操作可以重复执行而不改变数据规模。
+    """
+    scheduled_id = _first_id("SELECT id FROM tasks WHERE start_time IS NOT NULL AND status = 'pending' ORDER BY id LIMIT 1;")
+    scheduled = database_manager.get_task(scheduled_id) if scheduled_id else None
+    parent_id = _first_id("SELECT parent_task_id FROM tasks WHERE parent_task_id IS NOT NULL ORDER BY id LIMIT 1;")
+    some_id = _first_id("SELECT id FROM tasks ORDER BY id LIMIT 1;")
+    some_task = database_manager.get_task(some_id)
+    series_id = _first_id("SELECT id FROM recurring_series ORDER BY id LIMIT 1;")
+    page_parent_ids = [t['id'] for t in database_manager.get_parent_tasks_page(None, limit=20)]
+    window_start = f"{TARGET_DATE}T00:00:00"
+    window_end = (data_generator.BASE_DATE + datetime.timedelta(days=1)).strftime(TIME_FORMAT)
+    week_end = (data_generator.BASE_DATE + datetime.timedelta(days=6)).isoformat()
+    new_task = {"task_name": "基准测试临时任务", "start_time": f"{TARGET_DATE}T21:00:00",
+                "end_time": f"{TARGET_DATE}T21:30:00", "duration_minutes": 30, "priority": "Low"}
+
+    def restore_schedule(args, result):
+        database_manager.update_task_schedule(scheduled['id'], scheduled['start_time'], scheduled['end_time'])
+
+    def delete_created(args, result):
+        if result:
+            database_manager.delete_task(result)
+
+    def add_temp_task():
+        return (database_manager.add_task_from_dify(new_task),)
+
+    def delete_temp_parent(args, result):
+        database_manager.delete_task(args[0])
+
+    def add_temp_series():
+        return (database_manager.add_recurring_series({"task_name": "基准测试系列", "start_date": TARGET_DATE, "freq": "DAILY"}),)
+
+    occurrence = (series_id, TARGET_DATE)
+    return [
+        ("init_db", database_manager.init_db, _args(), None),
+        ("add_task_from_dify", database_manager.add_task_from_dify, _args(new_task), delete_created),
+        ("add_subtasks", database_manager.add_subtasks,
+         lambda: (database_manager.add_task_from_dify(new_task), [{"task_name": f"子任务{i}", "duration_minutes": 30} for i in range(5)]),
+         delete_temp_parent),
+        ("get_all_tasks", database_manager.get_all_tasks, _args(), None),
+        ("update_task_status", database_manager.update_task_status, _args(some_id, some_task['status']), None),
+        ("update_task_name", database_manager.update_task_name, _args(some_id, some_task['task_name']), None),
+        ("update_task_details", database_manager.update_task_details, _args(some_id, some_task['details']), None),
+        ("update_task_content", database_manager.update_task_content,
+         _args(some_id, some_task['task_name'], some_task['details'], some_task['priority']), None),
+        ("update_task_duration", database_manager.update_task_duration, _args(some_id, some_task['duration_minutes']), None),
+        ("delete_task", database_manager.delete_task, add_temp_task, None),
+        ("get_fixed_events", database_manager.get_fixed_events, _args(TARGET_DATE), None),
+        ("get_flexible_tasks", database_manager.get_flexible_tasks, _args(TARGET_DATE), None),
+        ("update_task_schedule", database_manager.update_task_schedule,
+         _args(scheduled['id'], scheduled['start_time'], scheduled['end_time']), None),
+        ("update_task_schedules", database_manager.update_task_schedules,
+         _args([(scheduled['id'], scheduled['start_time'], scheduled['end_time'])]), None),
+        ("postpone_task", database_manager.postpone_task, _args(scheduled['id']), restore_schedule),
+        ("count_parent_tasks", database_manager.count_parent_tasks, _args('pending', TARGET_DATE, 'High'), None),
+        ("get_parent_tasks_page", database_manager.get_parent_tasks_page, _args('pending', None, None, 20, 0), None),
+        ("get_child_tasks", database_manager.get_child_tasks, _args(page_parent_ids), None),
+        ("count_completed_groups", database_manager.count_completed_groups, _args(), None),
+        ("get_completed_groups_page", database_manager.get_completed_groups_page, _args(20, 0), None),
+        ("get_task", database_manager.get_task, _args(some_id), None),
+        ("get_scheduled_tasks", database_manager.get_scheduled_tasks, _args(TARGET_DATE), None),
+        ("get_upcoming_tasks", database_manager.get_upcoming_tasks, _args(window_start, window_end), None),
+        ("get_decomposed_parents", database_manager.get_decomposed_parents, _args(0), None),
+        ("get_subtask_templates", database_manager.get_subtask_templates, _args(parent_id), None),
+        ("add_recurring_series", database_manager.add_recurring_series,
+         _args({"task_name": "基准测试系列", "start_date": TARGET_DATE, "freq": "DAILY"}),
+         lambda args, result: database_manager.delete_recurring_series(result)),
+        ("delete_recurring_series", database_manager.delete_recurring_series, add_temp_series, None),
+        ("set_occurrence_exception", database_manager.set_occurrence_exception, _args(*occurrence, 'completed'),
+         lambda args, result: database_manager.clear_occurrence_exception(*occurrence)),
+        ("clear_occurrence_exception", database_manager.clear_occurrence_exception, _args(*occurrence), None),
+        ("get_occurrences", database_manager.get_occurrences, _args(TARGET_DATE, TARGET_DATE), None),
+        ("get_postponed_occurrences", database_manager.get_postponed_occurrences, _args(), None),
+        ("reopen_occurrence", database_manager.reopen_occurrence, _args(*occurrence), None),
+        ("get_recurring_series", database_manager.get_recurring_series, _args(series_id), None),
+        ("get_occurrence", database_manager.get_occurrence, _args(*occurrence), None),
+        ("list_recurring_series", database_manager.list_recurring_series, _args(), None),
+        ("find_free_slots (一周, 冷)", task_availability.find_free_slots,
+         lambda: (task_availability.invalidate(), (90, TARGET_DATE, week_end))[1], None),
+        ("find_free_slots (一周, 缓存)", task_availability.find_free_slots, _args(90, TARGET_DATE, week_end), None),
+        ("get_daily_load (一周)", task_availability.get_daily_load, _args(TARGET_DATE, week_end), None),
+        ("find_conflicts", task_availability.find_conflicts, _args(window_start, f"{TARGET_DATE}T23:59:00"), None),
+        ("refresh_tasks (分页首屏)", _refresh_tasks_first_page, _args(), None),
+        ("refresh_tasks (整表分组对照)", _refresh_tasks_full_grouping, _args(), None),
+    ]
+
+
+def _run_case(func, setup, teardown, repeat):
+    timings = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+        if teardown:
+            teardown(args, result)
+    # 内存单独测一次，避免 tracemalloc 的开销影响计时
+    args = setup()
+    tracemalloc.start()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if teardown:
+        teardown(args, result)
+    return timings, peak
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def run_benchmarks(repeat: int = 10):
+    """运行全部用例，返回结果行列表"""
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        cases = build_cases()
+        for name, func, setup, teardown in cases:
+            timings, peak = _run_case(func, setup, teardown, repeat)
+            results.append({
+                'name': name,
+                'mean_ms': statistics.mean(timings),
+                'p50_ms': _percentile(timings, 0.5),
+                'p95_ms': _percentile(timings, 0.95),
+                'peak_kb': peak / 1024,
+            })
+    covered = {name for name, *_ in cases}
+    public = {name for name, value in vars(database_manager).items()
+              if callable(value) and not name.startswith('_') and getattr(value, '__module__', None) == database_manager.__name__}
+    missing = sorted(public - covered - NOT_BENCHMARKED)
+    return results, missing
+
+def format_results(results, missing, task_count=None):
+    lines = []
+    if task_count is not None:
+        lines.append(f"=== 基准测试结果 ({task_count} 个任务) ===")
+    lines.append(f"{'用例':<36}{'平均(ms)':>12}{'p50(ms)':>12}{'p95(ms)':>12}{'峰值内存(KB)':>16}")
+    for row in results:
+        lines.append(f"{row['name']:<36}{row['mean_ms']:>12.3f}{row['p50_ms']:>12.3f}{row['p95_ms']:>12.3f}{row['peak_kb']:>16.1f}")
+    if missing:
+        lines.append(f"[!] 以下 database_manager 函数没有基准用例: {', '.join(missing)}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="database_manager 基准测试")
+    parser.add_argument("--tasks", type=int, default=10000, help="生成的任务数量（默认 10000）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=10, help="每个用例重复次数")
+    parser.add_argument("--db", default=data_generator.DEFAULT_BENCH_DB)
+    parser.add_argument("--no-generate", action="store_true", help="直接使用已有的数据库")
+    args = parser.parse_args()
+
+    if not args.no_generate:
+        data_generator.generate_database(args.db, args.tasks, args.seed)
+    database_manager.DB_PATH = args.db
+    results, missing = run_benchmarks(args.repeat)
+    print(format_results(results, missing, _first_id("SELECT COUNT(*) FROM tasks;")))
@@ -0,0 +1,318 @@
+# db_profiler.py (V1 - 数据库性能分析)
+"""
+database_manager 的可选性能分析层
+
+启用后（环境变量 TASKY_DB_PROFILE=1，或调用 enable()）会：
+- 给 database_manager 的每个公开函数计时，统计调用次数、总耗时、最大耗时和延迟直方图；
+- 给每条 SQL 计时，超过阈值（TASKY_SLOW_QUERY_MS，默认 50 毫秒）的语句连同
+  EXPLAIN QUERY PLAN 的结果记入慢查询日志。
+未启用时不做任何修改，没有额外开销。
+
+报告可以通过 `python db_profiler.py`（命令行）或 Streamlit 侧边栏的调试面板查看。
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+
+import database_manager
+
+# 延迟直方图的桶上界（毫秒）
+HISTOGRAM_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float('inf'))
+SLOW_LOG_SIZE = 200
+
+_lock = threading.Lock()
+_operation_stats = {}
+_query_stats = {}
+_slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+_original_functions = {}
+_slow_query_ms = float(os.getenv("TASKY_SLOW_QUERY_MS", "50"))
+
+
+# --- 统计 ---
+
+def _new_stats():
+    return {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'histogram': [0] * len(HISTOGRAM_BUCKETS_MS)}
+
+def _record(table, key, elapsed_ms):
+    with _lock:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = _new_stats()
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        for index, upper in enumerate(HISTOGRAM_BUCKETS_MS):
+            if elapsed_ms <= upper:
+                stats['histogram'][index] += 1
+                break
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+# --- SQL 级别的计时 ---
+
+class _ProfilingCursor(sqlite3.Cursor):
+    """
+    SQLite 在 fetch 时才逐行执行查询，所以一条语句的耗时 = execute + 之后所有 fetch 的时间。
+    语句在游标读完、再次 execute、关闭或所属连接的 with 块结束时才记入统计。
+    """
+    _statement = None  # [sql, 参数, 已累计的毫秒数]
+
+    def _begin(self, sql, parameters, elapsed_ms):
+        self._finish()
+        self._statement = [sql, parameters, elapsed_ms]
+        if self.description is None:
+            self._finish()  # 没有结果集的语句（INSERT/UPDATE 等）到这里就执行完了
+
+    def _add(self, elapsed_ms, exhausted):
+        if self._statement:
+            self._statement[2] += elapsed_ms
+            if exhausted:
+                self._finish()
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement:
+            _after_query(self.connection, *statement)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._begin(sql, parameters, (time.perf_counter() - start) * 1000)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        self._begin(sql, first, (time.perf_counter() - start) * 1000)
+        return result
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add((time.perf_counter() - start) * 1000, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add((time.perf_counter() - start) * 1000, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add((time.perf_counter() - start) * 1000, True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add((time.perf_counter() - start) * 1000, True)
+            raise
+        self._add((time.perf_counter() - start) * 1000, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class _ProfilingConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory=_ProfilingCursor):
+        cursor = super().cursor(factory)
+        if isinstance(cursor, _ProfilingCursor):
+            self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def finish_statements(self):
+        """把还没读完的语句（例如只 fetchone 了一行）也记入统计"""
+        for cursor in list(self._cursors):
+            cursor._finish()
+
+    def __exit__(self, *exc_info):
+        self.finish_statements()
+        return super().__exit__(*exc_info)
+
+    def close(self):
+        self.finish_statements()
+        super().close()
+
+
+def _after_query(connection, sql, parameters, elapsed_ms):
+    normalized = _normalize_sql(sql)
+    _record(_query_stats, normalized, elapsed_ms)
+    if elapsed_ms < _slow_query_ms or normalized.upper().startswith(("EXPLAIN", "CREATE")):
+        return
+    plan = []
+    try:
+        # 用普通游标执行，避免再次进入计时逻辑
+        plan_cursor = sqlite3.Connection.cursor(connection)
+        plan_cursor.row_factory = None
+        plan_cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        plan = [row[-1] for row in plan_cursor.fetchall()]
+    except sqlite3.Error as e:
+        plan = [f"(无法获取查询计划: {e})"]
+    with _lock:
+        _slow_queries.append({
+            'sql': normalized,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'plan': plan,
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+
+class _ProfilingSqlite3:
+    """替换 database_manager 中的 sqlite3 模块引用，只改变 connect 的连接类型"""
+
+    def __getattr__(self, name):
+        return getattr(sqlite3, name)
+
+    @staticmethod
+    def connect(*args, **kwargs):
+        kwargs.setdefault('factory', _ProfilingConnection)
+        return sqlite3.connect(*args, **kwargs)
+
+
+# --- 函数级别的计时 ---
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(_operation_stats, name, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+def _public_functions():
+    for name, value in vars(database_manager).items():
+        if callable(value) and not name.startswith('_') and getattr(value, '__module__', None) == database_manager.__name__:
+            yield name, value
+
+
+# --- 公开接口 ---
+
+def is_enabled():
+    return bool(_original_functions)
+
+def enable(slow_query_ms: float = None):
+    """给 database_manager 装上计时层；重复调用只会更新慢查询阈值"""
+    global _slow_query_ms
+    if slow_query_ms is not None:
+        _slow_query_ms = slow_query_ms
+    if is_enabled():
+        return
+    _original_functions['sqlite3'] = database_manager.sqlite3
+    database_manager.sqlite3 = _ProfilingSqlite3()
+    for name, func in list(_public_functions()):
+        _original_functions[name] = func
+        setattr(database_manager, name, _timed(name, func))
+    print(f"[*] 数据库性能分析已启用，慢查询阈值 {_slow_query_ms} 毫秒。")
+
+def disable():
+    """恢复 database_manager 的原始函数"""
+    for name, original in _original_functions.items():
+        setattr(database_manager, name, original)
+    _original_functions.clear()
+
+def reset():
+    with _lock:
+        _operation_stats.clear()
+        _query_stats.clear()
+        _slow_queries.clear()
+
+def get_operation_stats():
+    """按总耗时从高到低返回每个 database_manager 函数的统计"""
+    with _lock:
+        rows = [dict(name=name, **{k: (list(v) if k == 'histogram' else v) for k, v in stats.items()})
+                for name, stats in _operation_stats.items()]
+    for row in rows:
+        row['avg_ms'] = row['total_ms'] / row['count']
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+def get_query_stats():
+    """按总耗时从高到低返回每条 SQL 的统计"""
+    with _lock:
+        rows = [{'sql': sql, 'count': s['count'], 'total_ms': s['total_ms'], 'max_ms': s['max_ms']}
+                for sql, s in _query_stats.items()]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+def get_slow_queries():
+    with _lock:
+        return list(_slow_queries)
+
+def _histogram_labels():
+    labels, lower = [], 0
+    for upper in HISTOGRAM_BUCKETS_MS:
+        labels.append(f">{lower}ms" if upper == float('inf') else f"≤{upper}ms")
+        lower = upper
+    return labels
+
+def format_report(top: int = 20) -> str:
+    """生成文本格式的报告，供命令行输出"""
+    labels = _histogram_labels()
+    lines = ["=== database_manager 函数耗时 ==="]
+    lines.append(f"{'函数':<32}{'次数':>8}{'总计(ms)':>12}{'平均(ms)':>12}{'最大(ms)':>12}  分布")
+    for row in get_operation_stats()[:top]:
+        distribution = ", ".join(f"{label}:{n}" for label, n in zip(labels, row['histogram']) if n)
+        lines.append(f"{row['name']:<32}{row['count']:>8}{row['total_ms']:>12.2f}{row['avg_ms']:>12.3f}{row['max_ms']:>12.3f}  {distribution}")
+
+    lines.append("")
+    lines.append("=== SQL 耗时 ===")
+    for row in get_query_stats()[:top]:
+        lines.append(f"[{row['count']}次, 共{row['total_ms']:.2f}ms, 最大{row['max_ms']:.3f}ms] {row['sql']}")
+
+    slow_queries = get_slow_queries()
+    lines.append("")
+    lines.append(f"=== 慢查询 (>{_slow_query_ms}ms，共 {len(slow_queries)} 条) ===")
+    for entry in slow_queries[-top:]:
+        lines.append(f"{entry['at']} {entry['elapsed_ms']}ms {entry['sql']}")
+        for step in entry['plan']:
+            lines.append(f"    └─ {step}")
+    return "\n".join(lines)
+
+
+if os.getenv("TASKY_DB_PROFILE") == "1":
+    enable()
+
+
+if __name__ == "__main__":
+    # 命令行：对当前数据库跑一遍常用的只读查询并输出报告
+    import datetime
+    import sys
+    enable(slow_query_ms=float(sys.argv[1]) if len(sys.argv) > 1 else None)
+    today = datetime.date.today().isoformat()
+    database_manager.init_db()
+    database_manager.get_all_tasks()
+    database_manager.get_fixed_events(today)
+    database_manager.get_flexible_tasks(today)
+    database_manager.get_scheduled_tasks(today)
+    database_manager.count_parent_tasks('pending')
+    database_manager.get_parent_tasks_page('pending')
+    database_manager.count_completed_groups()
+    database_manager.get_completed_groups_page()
+    database_manager.get_upcoming_tasks(f"{today}T00:00:00", f"{today}T23:59:59")
+    print(format_report())
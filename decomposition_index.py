@@ -0,0 +1,158 @@
+# decomposition_index.py (V1 - 复用历史分解结果)
+"""
+任务分解相似度索引
+
+对已经分解过（带子任务）的父任务，分别用 task_name 以及 task_name + details 的字符 n-gram
+计算 MinHash 签名，再按 LSH 分桶建立索引。新任务分解前先查索引：相似度超过阈值时直接复用历史子任务，
+否则才调用 task_decomposer.decompose_task。索引按子任务ID增量构建，只读取新增部分。
+"""
+
+import random
+import re
+import threading
+import zlib
+import database_manager
+import task_decomposer
+
+# 2^61 - 1，用于 MinHash 的通用哈希
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _normalize(text: str) -> str:
+    """小写化并去掉空白和标点，只保留文字和数字"""
+    return re.sub(r'[\W_]+', '', (text or '').lower())
+
+def _shingles(text: str, n: int = 2):
+    """字符 n-gram，中文按字切分，比按词切分更稳定"""
+    text = _normalize(text)
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class DecompositionIndex:
+    """
+    MinHash-LSH 索引。
+
+    :param num_perm: MinHash 签名长度
+    :param bands: LSH 分带数量，num_perm 必须能被它整除
+    :param threshold: 估计的 Jaccard 相似度达到该值才复用
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # 固定种子，保证同样的文本在不同进程里得到同样的签名
+        rng = random.Random(20250919)
+        self._params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._signatures = {}   # 父任务ID -> 签名元组（名称签名，以及有详情时的名称+详情签名）
+        self._buckets = [{} for _ in range(bands)]   # 每个分带: 桶键 -> 父任务ID集合
+        self._last_child_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _task_signatures(self, task_name: str, details: str = None):
+        texts = [task_name or '']
+        if details:
+            texts.append(f"{task_name or ''} {details}")
+        return tuple(sig for sig in (self._signature(text) for text in texts) if sig is not None)
+
+    def _signature(self, text: str):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in _shingles(text)]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, parent_id: int, task_name: str, details: str = None):
+        signatures = self._task_signatures(task_name, details)
+        if not signatures:
+            return
+        with self._lock:
+            self._signatures[parent_id] = signatures
+            for signature in signatures:
+                for band, key in self._band_keys(signature):
+                    self._buckets[band].setdefault(key, set()).add(parent_id)
+
+    def remove(self, parent_id: int):
+        """从索引中移除一个父任务（例如它的子任务已被删光）"""
+        with self._lock:
+            signatures = self._signatures.pop(parent_id, None)
+            for signature in signatures or ():
+                for band, key in self._band_keys(signature):
+                    bucket = self._buckets[band].get(key)
+                    if bucket is None:
+                        continue
+                    bucket.discard(parent_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def refresh(self):
+        """只读取上次之后新增了子任务的父任务"""
+        parents, max_child_id = database_manager.get_decomposed_parents(self._last_child_id)
+        for parent in parents:
+            self.add(parent['id'], parent['task_name'], parent['details'])
+        self._last_child_id = max_child_id
+        return len(parents)
+
+    def query(self, task_name: str, details: str = None):
+        """返回达到阈值的 [(父任务ID, 估计相似度), ...]，按相似度从高到低排序（相同时ID大的在前）"""
+        signatures = self._task_signatures(task_name, details)
+        if not signatures:
+            return []
+        with self._lock:
+            candidates = set()
+            for signature in signatures:
+                for band, key in self._band_keys(signature):
+                    candidates |= self._buckets[band].get(key, set())
+            matches = []
+            for parent_id in candidates:
+                score = max(
+                    sum(x == y for x, y in zip(signature, other)) / self.num_perm
+                    for signature in signatures for other in self._signatures[parent_id]
+                )
+                if score >= self.threshold:
+                    matches.append((parent_id, score))
+        matches.sort(key=lambda match: (match[1], match[0]), reverse=True)
+        return matches
+
+
+_default_index = None
+
+def get_default_index():
+    """进程内共享的索引实例，首次使用时从数据库构建"""
+    global _default_index
+    if _default_index is None:
+        _default_index = DecompositionIndex()
+    return _default_index
+
+def decompose_with_reuse(task_name: str, details: str = None, index=None):
+    """
+    先查相似度索引，按相似度依次尝试复用历史子任务，都不可用时才调用LLM分解。
+    子任务已被删光的父任务会从索引中移除。
+
+    :return: (子任务列表, 复用的父任务ID)；调用LLM时第二项为 None，失败时子任务列表为 None
+    """
+    if index is None:
+        index = get_default_index()
+    index.refresh()
+    for parent_id, score in index.query(task_name, details):
+        sub_tasks = database_manager.get_subtask_templates(parent_id)
+        if sub_tasks:
+            print(f"[*] 复用任务ID {parent_id} 的分解结果 (相似度 {score:.2f})，跳过LLM调用。")
+            return sub_tasks, parent_id
+        index.remove(parent_id)
+    return task_decomposer.decompose_task(task_name), None
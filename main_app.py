@@ -1,11 +1,14 @@
-# main_app.py (V1.5 - 修正了表单内的按钮错误)
+# main_app.py (V2.0 - 新增数据库性能调试面板)
 
 import streamlit as st
 import database_manager
+import db_profiler  # 设置 TASKY_DB_PROFILE=1 时自动启用数据库性能分析
 import task_parser
-import task_decomposer
+import decomposition_index
 import task_scheduler
-from datetime import datetime
+import task_rescheduler
+import task_availability
+from datetime import datetime, timedelta
 import os
 
 # --- 1. 页面基础配置 (必须是第一个st命令) ---
@@ -39,14 +42,67 @@ if 'editing_task_id' not in st.session_state:
     st.session_state.editing_task_id = None
 if 'confirming_delete_id' not in st.session_state:
     st.session_state.confirming_delete_id = None
+if 'pending_page' not in st.session_state:
+    st.session_state.pending_page = 0
+if 'completed_page' not in st.session_state:
+    st.session_state.completed_page = 0
+
+# 每页渲染的父任务数量，控制单次运行的组件数量
+PAGE_SIZE = 20
+PRIORITY_OPTIONS = ["全部", "High", "Medium", "Low"]
+STATUS_OPTIONS = ["全部", "待办", "已完成"]
 
 # --- 4. 辅助函数 (处理交互逻辑) ---
 
+@st.cache_resource
+def get_decomposition_index():
+    """分解相似度索引在各次运行之间共享，每次使用前只增量读取新的分解结果"""
+    return decomposition_index.DecompositionIndex()
+
 def handle_delete(task_id):
     """删除按钮 on_click 的回调函数"""
-    database_manager.delete_task(task_id)
+    task_rescheduler.delete_and_reschedule(task_id)
     st.session_state.confirming_delete_id = None
 
+def handle_toggle_status(task_id, is_completed):
+    """勾选框 on_change 的回调函数：完成时顺带把提前空出的时间让给灵活任务"""
+    if is_completed:
+        database_manager.update_task_status(task_id, 'pending')
+    else:
+        task_rescheduler.complete_and_reschedule(task_id)
+
+def handle_postpone(task_id):
+    """顺延按钮 on_click 的回调函数"""
+    task_rescheduler.postpone_and_reschedule(task_id)
+
+def handle_delete_series(series_id):
+    """删除整个重复任务系列（连同所有例外）"""
+    database_manager.delete_recurring_series(series_id)
+
+def reset_pagination():
+    """过滤条件变化时回到第一页"""
+    st.session_state.pending_page = 0
+    st.session_state.completed_page = 0
+
+def render_pagination(total_count, page_key):
+    """渲染翻页控件，返回当前页的 offset"""
+    total_pages = max(1, (total_count + PAGE_SIZE - 1) // PAGE_SIZE)
+    page = min(st.session_state[page_key], total_pages - 1)
+    st.session_state[page_key] = page
+    if total_pages > 1:
+        col_prev, col_info, col_next = st.columns([0.2, 0.6, 0.2])
+        with col_prev:
+            if st.button("⬅️ 上一页", key=f"{page_key}_prev", disabled=page == 0, use_container_width=True):
+                st.session_state[page_key] = page - 1
+                st.rerun()
+        with col_info:
+            st.caption(f"第 {page + 1} / {total_pages} 页，共 {total_count} 项")
+        with col_next:
+            if st.button("下一页 ➡️", key=f"{page_key}_next", disabled=page >= total_pages - 1, use_container_width=True):
+                st.session_state[page_key] = page + 1
+                st.rerun()
+    return page * PAGE_SIZE
+
 
 # --- 5. 核心渲染函数 ---
 
@@ -62,6 +118,7 @@ def display_task_item(task, all_child_tasks):
             st.markdown(f"**正在编辑: {task['task_name']}**")
             new_name = st.text_input("任务名称", value=task['task_name'])
             new_details = st.text_area("任务详情", value=task.get('details', ''))
+            new_duration = st.number_input("持续时间（分钟）", min_value=0, step=15, value=task.get('duration_minutes') or 0)
             
             # 表单的提交和取消按钮
             col_save, col_cancel = st.columns(2)
@@ -76,6 +133,8 @@ def display_task_item(task, all_child_tasks):
         if save_button_pressed:
             database_manager.update_task_name(task_id, new_name)
             database_manager.update_task_details(task_id, new_details)
+            if new_duration and new_duration != task.get('duration_minutes'):
+                task_rescheduler.update_duration_and_reschedule(task_id, int(new_duration))
             st.session_state.editing_task_id = None
             st.rerun()
         
@@ -110,8 +169,8 @@ def display_task_item(task, all_child_tasks):
             label=label_text,
             value=is_completed,
             key=f"check_{task_id}",
-            on_change=database_manager.update_task_status,
-            args=(task_id, 'pending' if is_completed else 'completed')
+            on_change=handle_toggle_status,
+            args=(task_id, is_completed)
         )
         
         if is_parent:
@@ -133,7 +192,7 @@ def display_task_item(task, all_child_tasks):
 
     with col2:
         if not is_completed: # 只为待办任务显示按钮
-            btn_cols = st.columns(3)
+            btn_cols = st.columns(4)
             with btn_cols[0]:
                 if st.button("✏️", key=f"edit_{task_id}", help="编辑"):
                     st.session_state.editing_task_id = task_id
@@ -147,56 +206,62 @@ def display_task_item(task, all_child_tasks):
                  if is_parent and task['duration_minutes'] and task['duration_minutes'] > 90 and not task_children:
                     if st.button("🧬", key=f"decompose_{task_id}", help="智能分解"):
                         with st.spinner("🧠 ..."):
-                            sub_tasks = task_decomposer.decompose_task(task['task_name'])
+                            sub_tasks, reused_from = decomposition_index.decompose_with_reuse(
+                                task['task_name'], task.get('details'), index=get_decomposition_index()
+                            )
                             if sub_tasks:
                                 database_manager.add_subtasks(task_id, sub_tasks)
+                                if reused_from:
+                                    st.toast(f"已复用相似任务 (ID: {reused_from}) 的分解结果")
                                 st.rerun()
                             else:
                                 st.error("分解失败")
+            with btn_cols[3]:
+                if task.get('start_time'):
+                    st.button("⏭️", key=f"postpone_{task_id}", help="顺延", on_click=handle_postpone, args=(task_id,))
 
 
-def refresh_tasks():
-    all_tasks = database_manager.get_all_tasks()
-    tasks_by_id = {task['id']: task for task in all_tasks}
-    parent_tasks = [t for t in all_tasks if t['parent_task_id'] is None]
-    child_tasks = [t for t in all_tasks if t['parent_task_id'] is not None]
+def refresh_tasks(target_date=None, priority=None, status_filter="全部"):
+    """只查询并渲染当前页需要的任务，过滤条件下推到数据库"""
+    if status_filter in ("全部", "待办"):
+        st.header("🎯 待办任务")
+        pending_count = database_manager.count_parent_tasks('pending', target_date, priority)
+        if not pending_count and (target_date or priority):
+            st.info("没有符合筛选条件的待办任务。")
+        elif not pending_count:
+            st.success("所有任务都已完成！🎉")
+        else:
+            offset = render_pagination(pending_count, 'pending_page')
+            pending_parent_tasks = database_manager.get_parent_tasks_page('pending', target_date, priority, PAGE_SIZE, offset)
+            child_tasks = database_manager.get_child_tasks([t['id'] for t in pending_parent_tasks])
+            for task in pending_parent_tasks:
+                display_task_item(task, child_tasks)
+                pending_children = [ct for ct in child_tasks if ct['parent_task_id'] == task['id'] and ct['status'] == 'pending']
+                for child in pending_children:
+                    display_task_item(child, child_tasks)
+                st.divider()
 
-    st.header("🎯 待办任务")
-    pending_tasks = [t for t in all_tasks if t['status'] == 'pending']
-    if not pending_tasks:
-        st.success("所有任务都已完成！🎉")
-    else:
-        pending_parent_tasks = [pt for pt in parent_tasks if pt['status'] == 'pending']
-        for task in pending_parent_tasks:
-            display_task_item(task, child_tasks)
-            pending_children = [ct for ct in child_tasks if ct['parent_task_id'] == task['id'] and ct['status'] == 'pending']
-            for child in pending_children:
-                display_task_item(child, child_tasks)
-            st.divider()
-
-    st.header("✅ 已完成的任务")
-    completed_tasks = [t for t in all_tasks if t['status'] == 'completed']
-    if completed_tasks:
-        parent_ids_in_completed = sorted(list(set(
-            [t['id'] for t in parent_tasks if t['status'] == 'completed'] +
-            [t['parent_task_id'] for t in child_tasks if t['status'] == 'completed']
-        )))
-
-        for parent_id in parent_ids_in_completed:
-            parent_task = tasks_by_id.get(parent_id)
-            if not parent_task: continue
-
-            if parent_task['status'] == 'pending':
-                st.markdown(f"**{parent_task['task_name']}** (有已完成子项)")
-            else:
-                display_task_item(parent_task, child_tasks)
-            
-            completed_children = [ct for ct in child_tasks if ct['parent_task_id'] == parent_id and ct['status'] == 'completed']
-            for child in completed_children:
-                display_task_item(child, child_tasks)
-            st.divider()
-    else:
-        st.info("还没有已完成的任务。")
+    if status_filter in ("全部", "已完成"):
+        st.header("✅ 已完成的任务")
+        # 已完成列表默认折叠，只有展开时才查询和渲染
+        show_completed = st.toggle("展开已完成的任务", value=(status_filter == "已完成"), key="show_completed")
+        if not show_completed:
+            return
+        completed_count = database_manager.count_completed_groups(target_date, priority)
+        if completed_count:
+            offset = render_pagination(completed_count, 'completed_page')
+            parent_tasks, completed_children = database_manager.get_completed_groups_page(PAGE_SIZE, offset, target_date, priority)
+            for parent_task in parent_tasks:
+                if parent_task['status'] == 'pending':
+                    st.markdown(f"**{parent_task['task_name']}** (有已完成子项)")
+                else:
+                    display_task_item(parent_task, completed_children)
+
+                for child in [ct for ct in completed_children if ct['parent_task_id'] == parent_task['id']]:
+                    display_task_item(child, completed_children)
+                st.divider()
+        else:
+            st.info("没有符合筛选条件的已完成任务。" if (target_date or priority) else "还没有已完成的任务。")
 
 
 # --- 6. 主界面 ---
@@ -207,8 +272,8 @@ with st.form("new_task_form", clear_on_submit=True):
     new_task_input = st.text_input("✨ 在这里输入你的新任务", placeholder="例如：明天下午三点和李总开会，讨论Q4规划")
     submitted = st.form_submit_button("添加任务")
     if submitted and new_task_input:
-        with st.spinner("🧠 正在调用AI大脑解析任务..."):
-            parsed_json = task_parser.parse_task_with_llm(new_task_input)
+        with st.spinner("🧠 正在解析任务..."):
+            parsed_json = task_parser.parse_task(new_task_input)
             if parsed_json:
                 database_manager.add_task_from_dify(parsed_json)
                 st.rerun()
@@ -220,12 +285,13 @@ if st.sidebar.button("🤖 一键智能排程"):
     target_date = datetime.now().strftime('%Y-%m-%d')
     with st.spinner(f"🗓️ 正在为您规划 {target_date} 的日程..."):
         fixed_events = database_manager.get_fixed_events(target_date)
-        flexible_tasks = database_manager.get_flexible_tasks()
+        flexible_tasks = database_manager.get_flexible_tasks(target_date)
         if not flexible_tasks:
             st.sidebar.warning("没有需要排程的灵活任务。")
         else:
-            tasks_for_ai = [{"task_name": t["task_name"], "duration_minutes": t["duration_minutes"], "priority": t["priority"]} for t in flexible_tasks]
-            schedule_result = task_scheduler.schedule_tasks(tasks_for_ai, fixed_events, target_date)
+            tasks_for_ai = [t.to_schedule_json() for t in flexible_tasks]
+            events_for_ai = [e.to_event_json() for e in fixed_events]
+            schedule_result = task_scheduler.schedule_tasks(tasks_for_ai, events_for_ai, target_date)
             if schedule_result:
                 task_name_to_id_map = {t["task_name"]: t["id"] for t in flexible_tasks}
                 success_count = 0
@@ -240,6 +306,97 @@ if st.sidebar.button("🤖 一键智能排程"):
             else:
                 st.sidebar.error("抱歉，AI排程失败。")
 
+st.sidebar.divider()
+with st.sidebar.expander("🔁 新增重复任务"):
+    with st.form("recurring_form", clear_on_submit=True):
+        series_name = st.text_input("任务名称", placeholder="例如：团队每日站会")
+        series_date = st.date_input("首次日期")
+        series_has_time = st.checkbox("固定时刻", value=True)
+        series_clock = st.time_input("开始时间")
+        series_duration = st.number_input("持续时间（分钟）", min_value=5, step=5, value=30)
+        series_freq = st.selectbox("重复频率", ["DAILY", "WEEKLY", "MONTHLY"],
+                                   format_func=lambda f: {"DAILY": "每天", "WEEKLY": "每周", "MONTHLY": "每月"}[f])
+        series_interval = st.number_input("间隔", min_value=1, step=1, value=1)
+        if st.form_submit_button("添加重复任务") and series_name:
+            series_json = {
+                "task_name": series_name, "duration_minutes": int(series_duration),
+                "freq": series_freq, "interval": int(series_interval),
+            }
+            if series_has_time:
+                series_json["start_time"] = datetime.combine(series_date, series_clock).strftime('%Y-%m-%dT%H:%M:%S')
+            else:
+                series_json["start_date"] = series_date.isoformat()
+            if database_manager.add_recurring_series(series_json):
+                st.rerun()
+
+today_str = datetime.now().strftime('%Y-%m-%d')
+sidebar_occurrences = database_manager.get_occurrences(today_str, today_str) + database_manager.get_postponed_occurrences()
+if sidebar_occurrences:
+    st.sidebar.caption("今日重复任务 / 已顺延的发生")
+    for occurrence in sidebar_occurrences:
+        occurrence_done = occurrence.status == 'completed'
+        when = occurrence.start_time[5:16].replace('T', ' ') if occurrence.start_time else "待安排"
+        col_check, col_postpone, col_cancel = st.sidebar.columns([0.7, 0.15, 0.15])
+        with col_check:
+            st.checkbox(f"{occurrence.task_name} ({when})", value=occurrence_done, key=f"check_{occurrence.id}",
+                        on_change=handle_toggle_status, args=(occurrence.id, occurrence_done))
+        if not occurrence_done:
+            with col_postpone:
+                if occurrence.start_time:
+                    st.button("⏭️", key=f"postpone_{occurrence.id}", help="顺延这一次", on_click=handle_postpone, args=(occurrence.id,))
+            with col_cancel:
+                st.button("🗑️", key=f"cancel_{occurrence.id}", help="取消这一次",
+                          on_click=task_rescheduler.delete_and_reschedule, args=(occurrence.id,))
+
+all_series = database_manager.list_recurring_series()
+if all_series:
+    with st.sidebar.expander("🗂️ 管理重复任务系列"):
+        series_to_delete = st.selectbox("系列", all_series, format_func=lambda row: f"{row['task_name']} ({row['freq']})", key="series_to_delete")
+        confirm_delete_series = st.checkbox("确认删除整个系列（包括所有单次修改）", key="confirm_delete_series")
+        st.button("删除系列", key="delete_series", disabled=not confirm_delete_series,
+                  on_click=handle_delete_series, args=(series_to_delete['id'],))
+
+with st.sidebar.expander("🕒 查找空闲时间"):
+    slot_duration = st.number_input("需要多长时间（分钟）", min_value=15, step=15, value=60, key="slot_duration")
+    slot_days = st.number_input("查找未来几天", min_value=1, max_value=30, step=1, value=7, key="slot_days")
+    if st.button("查找", key="find_slots"):
+        range_start = datetime.now().strftime('%Y-%m-%d')
+        range_end = (datetime.now() + timedelta(days=int(slot_days) - 1)).strftime('%Y-%m-%d')
+        slots = task_availability.find_free_slots(int(slot_duration), range_start, range_end, earliest=datetime.now(), limit=10)
+        if slots:
+            for slot_start, slot_end in slots:
+                st.write(f"{slot_start[5:10]} {slot_start[11:16]} - {slot_end[11:16]}")
+        else:
+            st.info("这段时间内没有足够长的空闲时间。")
+        for day, load in task_availability.get_daily_load(range_start, range_end).items():
+            st.caption(f"{day[5:]}：已安排 {load['busy_minutes']} 分钟，工作时间空闲 {load['free_work_minutes']} 分钟")
+
+st.sidebar.divider()
+st.sidebar.subheader("🔍 筛选")
+filter_by_date = st.sidebar.checkbox("按日期筛选", key="filter_by_date", on_change=reset_pagination)
+filter_date = st.sidebar.date_input("日期", key="filter_date", on_change=reset_pagination, disabled=not filter_by_date)
+filter_priority = st.sidebar.selectbox("优先级", PRIORITY_OPTIONS, key="filter_priority", on_change=reset_pagination)
+filter_status = st.sidebar.selectbox("状态", STATUS_OPTIONS, key="filter_status", on_change=reset_pagination)
+
+if db_profiler.is_enabled():
+    with st.sidebar.expander("🛠️ 调试：数据库性能"):
+        if st.button("清空统计", key="reset_profiler"):
+            db_profiler.reset()
+        st.caption("database_manager 函数耗时")
+        st.dataframe(
+            [{k: v for k, v in row.items() if k != 'histogram'} for row in db_profiler.get_operation_stats()],
+            use_container_width=True
+        )
+        st.caption("SQL 耗时")
+        st.dataframe(db_profiler.get_query_stats(), use_container_width=True)
+        st.caption("慢查询日志")
+        for entry in reversed(db_profiler.get_slow_queries()):
+            st.code(f"-- {entry['at']} {entry['elapsed_ms']}ms\n{entry['sql']}\n-- " + "\n-- ".join(entry['plan']), language="sql")
+
 # --- 7. 渲染主函数 ---
-refresh_tasks()
+refresh_tasks(
+    target_date=filter_date.strftime('%Y-%m-%d') if filter_by_date else None,
+    priority=None if filter_priority == "全部" else filter_priority,
+    status_filter=filter_status
+)
 
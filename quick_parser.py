@@ -0,0 +1,411 @@
+# quick_parser.py (V1 - 本地规则快速解析)
+"""
+本地快速解析模块
+
+用规则识别常见的中文（以及简单英文）任务描述中的日期、时间、时长、地点和优先级，
+以东八区当前时间为基准推算，返回与 task_parser.parse_task_with_llm 相同结构的字典，
+并附带一个 0~1 的 confidence。置信度不够时由 task_parser.parse_task 回退到LLM。
+"""
+
+import datetime
+import re
+import pytz
+
+TIMEZONE = 'Asia/Shanghai'
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+DEFAULT_DURATION_MINUTES = 60
+# 置信度达到这个值才直接采用本地结果（task_parser.parse_task 的默认阈值）
+CONFIDENCE_THRESHOLD = 0.75
+SEPARATOR = '|'
+
+_CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5,
+              '六': 6, '七': 7, '八': 8, '九': 9}
+_CN_NUM = r'[零〇一二两三四五六七八九十\d]+'
+_WEEKDAYS_CN = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6,
+                '1': 0, '2': 1, '3': 2, '4': 3, '5': 4, '6': 5, '7': 6}
+_WEEKDAYS_EN = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6}
+_RELATIVE_DAYS_CN = {'今天': 0, '今日': 0, '今晚': 0, '明天': 1, '明日': 1, '明早': 1, '明晚': 1, '后天': 2, '大后天': 3}
+_PM_PERIODS = ('下午', '傍晚', '晚上', '夜里', '今晚', '明晚')
+_RANGE_WORDS = r'\s*(?:到|至|-|~|～|—)'
+# “好一点”“快一点”里的“一点”是程度副词，不是一点钟
+_DEGREE_PREFIXES = '快好慢多少早晚大小高低得再稍'
+
+
+def cn_to_int(text: str):
+    """把“十二”“二十三”“3”这类数字转换为整数，无法识别时返回 None"""
+    if text.isdigit():
+        return int(text)
+    if '十' in text:
+        tens, _, ones = text.partition('十')
+        tens_value = _CN_DIGITS.get(tens, 1) if tens else 1
+        ones_value = _CN_DIGITS.get(ones, 0) if ones else 0
+        if (tens and tens not in _CN_DIGITS) or (ones and ones not in _CN_DIGITS):
+            return None
+        return tens_value * 10 + ones_value
+    if len(text) == 1 and text in _CN_DIGITS:
+        return _CN_DIGITS[text]
+    return None
+
+
+class _Extraction:
+    """记录解析过程中识别到的字段，并把已识别的片段从文本中替换掉"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.date = None
+        self.hour = None
+        self.minute = 0
+        self.period = None
+        self.duration = None
+        self.location = None
+        self.priority = None
+        self.date_count = 0
+        self.clock_count = 0
+        self.penalties = []
+
+    def take(self, pattern, handler, flags=0, replacement=SEPARATOR):
+        """
+        识别出的片段默认替换成分隔符，修饰词传 replacement='' 以免把任务名切开。
+        handler 返回 False 表示这处匹配不算数，原文保持不变。
+        """
+        def replace(match):
+            if handler(match) is False:
+                return match.group(0)
+            return replacement
+        self.text = re.sub(pattern, replace, self.text, flags=flags)
+
+
+# --- 中文规则 ---
+
+def _next_weekday(today, weekday, week_offset):
+    monday = today - datetime.timedelta(days=today.weekday())
+    return monday + datetime.timedelta(weeks=week_offset, days=weekday)
+
+def _parse_chinese(ex: _Extraction, today: datetime.date):
+    def absolute_date(m):
+        ex.date_count += 1
+        try:
+            ex.date = datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            ex.penalties.append(('无效日期', 0.5))
+    ex.take(r'(\d{4})[-/年](\d{1,2})[-/月](\d{1,2})[日号]?', absolute_date)
+
+    def month_day(m):
+        ex.date_count += 1
+        month, day = cn_to_int(m.group(1)), cn_to_int(m.group(2))
+        try:
+            candidate = datetime.date(today.year, month, day)
+        except (TypeError, ValueError):
+            ex.penalties.append(('无效日期', 0.5))
+            return
+        ex.date = candidate if candidate >= today else candidate.replace(year=today.year + 1)
+    ex.take(rf'({_CN_NUM})月({_CN_NUM})[日号]', month_day)
+
+    def relative_day(m):
+        ex.date_count += 1
+        word = m.group(1)
+        ex.date = today + datetime.timedelta(days=_RELATIVE_DAYS_CN[word])
+        if word in ('今晚', '明晚'):
+            ex.period = word
+        elif word == '明早':
+            ex.period = '早上'
+    ex.take(r'(大后天|后天|明天|明日|明早|明晚|今天|今日|今晚)', relative_day)
+
+    def weekday(m):
+        ex.date_count += 1
+        prefix, day = m.group(1) or '', _WEEKDAYS_CN[m.group(3)]
+        if prefix == '下下':
+            ex.date = _next_weekday(today, day, 2)
+        elif prefix == '下':
+            ex.date = _next_weekday(today, day, 1)
+        elif prefix in ('本', '这'):
+            ex.date = _next_weekday(today, day, 0)
+        else:
+            candidate = _next_weekday(today, day, 0)
+            ex.date = candidate if candidate >= today else candidate + datetime.timedelta(weeks=1)
+    ex.take(r'(下下|下|本|这)?个?(周|星期|礼拜)([一二三四五六日天1-7])', weekday)
+
+    # 时长要在时刻之前识别，避免“三小时”中的“时”被当成“三时”
+    def hours_duration(m):
+        number, half = m.group(1), m.group(2)
+        if number:
+            value = float(number) if re.fullmatch(r'\d+(\.\d+)?', number) else cn_to_int(number)
+            if value is None:
+                return
+        else:
+            value = 0
+        ex.duration = int(round(value * 60)) + (30 if half else 0)
+    ex.take(rf'(?:大概|大约|约|持续|用时|花)?(\d+(?:\.\d+)?|{_CN_NUM})?个?(半)?(?:小时|钟头)(?:左右)?', hours_duration)
+
+    def minutes_duration(m):
+        value = cn_to_int(m.group(1))
+        if value is not None:
+            ex.duration = value
+    ex.take(rf'(?:大概|大约|约|持续|用时|花)?({_CN_NUM})分钟(?:左右)?', minutes_duration)
+
+    def period(m):
+        ex.period = m.group(1)
+    ex.take(r'(凌晨|早上|早晨|上午|中午|下午|傍晚|晚上|夜里)', period)
+
+    def clock(m):
+        number, suffix = m.group(1), m.group(2) or ''
+        if number == '一' and m.group(0).startswith('一点') and not suffix and not m.group(0).endswith('钟'):
+            preceding = m.string[m.start() - 1] if m.start() else ''
+            if preceding in _DEGREE_PREFIXES or not (ex.period or ex.date):
+                return False
+        ex.clock_count += 1
+        if re.match(_RANGE_WORDS, m.string[m.end():]):
+            ex.penalties.append(('时间范围', 0.5))
+        hour = cn_to_int(number)
+        if hour is None or hour > 24:
+            ex.penalties.append(('无法识别的时刻', 0.5))
+            return
+        ex.hour = hour
+        if suffix == '半':
+            ex.minute = 30
+        elif suffix == '一刻':
+            ex.minute = 15
+        elif suffix == '三刻':
+            ex.minute = 45
+        elif suffix:
+            minute = cn_to_int(suffix.rstrip('分'))
+            ex.minute = minute if minute is not None and minute < 60 else 0
+    ex.take(rf'({_CN_NUM})[点:：](半|一刻|三刻|{_CN_NUM}分?)?钟?', clock)
+
+    def location(m):
+        ex.location = m.group(1)
+    ex.take(r'在([^，,。；;|\s]{2,15}?)(?=开会|开|讨论|见面|见|参加|进行|做|上课|吃饭|吃|聊|面试|[，,。；;|]|$)', location)
+    ex.take(r'(?:地点|地址)[:：]?\s*([^，,。；;|\s]+)', location)
+
+    lowered = ex.text
+    if re.search(r'不急|不重要|有空|抽空|随便|闲时', lowered):
+        ex.priority = 'Low'
+    else:
+        urgent = re.search(r'紧急|很急|着急|加急|尽快|马上|立刻|立即', lowered)
+        important = re.search(r'重要|关键', lowered)
+        if urgent and important:
+            ex.priority = 'High'
+        elif urgent or important:
+            ex.priority = 'Medium'
+    ex.take(r'(?:非常|很|特别|比较)?(?:不急|不重要|有空|抽空|紧急|很急|着急|加急|重要|关键)的?', lambda m: None, replacement='')
+    ex.take(r'(?:尽快|马上|立刻|立即)', lambda m: None, replacement='')
+
+def _resolve_hour_chinese(ex: _Extraction):
+    """返回 0~24 点，24 表示这一天结束时的零点（即次日 00:00）"""
+    hour = ex.hour
+    if ex.period in _PM_PERIODS and hour < 12:
+        hour += 12
+    elif ex.period in ('晚上', '夜里', '今晚', '明晚') and hour == 12:
+        hour = 24  # “晚上12点”是当晚的零点，不是中午
+    elif ex.period == '中午' and hour < 6:
+        hour += 12
+    elif ex.period is None and 1 <= hour <= 6:
+        # “三点开会”通常指下午
+        hour += 12
+        ex.penalties.append(('未说明上午还是下午', 0.1))
+    return hour
+
+
+# --- 英文规则 ---
+
+def _parse_english(ex: _Extraction, today: datetime.date):
+    def relative_day(m):
+        word = m.group(1).lower()
+        ex.date_count += 1
+        ex.date = today + datetime.timedelta(days={'today': 0, 'tonight': 0, 'tomorrow': 1}.get(word, 2))
+        if word == 'tonight':
+            ex.period = '晚上'
+    ex.take(r'\b(day after tomorrow|tomorrow|today|tonight)\b', relative_day, re.IGNORECASE)
+
+    def weekday(m):
+        ex.date_count += 1
+        day = _WEEKDAYS_EN[m.group(2).lower()]
+        if m.group(1) and m.group(1).lower().startswith('next'):
+            ex.date = _next_weekday(today, day, 1)
+        else:
+            candidate = _next_weekday(today, day, 0)
+            ex.date = candidate if candidate >= today else candidate + datetime.timedelta(weeks=1)
+    ex.take(r'\b(next\s+|this\s+|on\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', weekday, re.IGNORECASE)
+
+    def duration(m):
+        amount, unit = m.group(1).lower(), m.group(2).lower()
+        if amount.startswith('half'):
+            value = 0.5
+        elif amount in ('a', 'an', 'one'):
+            value = 1
+        elif amount == 'two':
+            value = 2
+        else:
+            value = float(amount)
+        ex.duration = int(round(value * 60)) if unit.startswith('h') else int(value)
+    ex.take(r'\b(?:for\s+)?(half an?|an?|one|two|\d+(?:\.\d+)?)\s*(hours?|hrs?|h|minutes?|mins?)\b', duration, re.IGNORECASE)
+
+    def clock(m):
+        hour, minute, meridiem = int(m.group(1)), int(m.group(2) or 0), (m.group(3) or '').lower()
+        if hour > 24 or minute > 59:
+            return False
+        ex.clock_count += 1
+        if re.match(_RANGE_WORDS, m.string[m.end():]):
+            ex.penalties.append(('time range', 0.5))
+        if meridiem == 'pm' and hour < 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+        ex.hour, ex.minute, ex.period = hour, minute, 'explicit'
+    ex.take(r'\b(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b', clock, re.IGNORECASE)
+    ex.take(r'\b(?:at\s+)?(\d{1,2}):(\d{2})()\b', clock, re.IGNORECASE)
+
+    def noon(m):
+        ex.clock_count += 1
+        ex.hour, ex.minute, ex.period = 12, 0, 'explicit'
+    ex.take(r'\b(?:at\s+)?noon\b', noon, re.IGNORECASE)
+
+    def location(m):
+        ex.location = m.group(1).strip()
+    ex.take(r'\b(?:in|at)\s+((?:the\s+)?[A-Z][\w-]*(?:\s+[A-Z0-9][\w-]*)*)', location)
+
+    text = ex.text.lower()
+    if re.search(r'\b(low priority|whenever|no rush)\b', text):
+        ex.priority = 'Low'
+    else:
+        urgent = re.search(r'\b(urgent|asap|immediately)\b', text)
+        important = re.search(r'\b(important|critical)\b', text)
+        if urgent and important:
+            ex.priority = 'High'
+        elif urgent or important:
+            ex.priority = 'Medium'
+    ex.take(r'\b(low priority|whenever|no rush|urgent(ly)?|asap|immediately|important|critical)\b', lambda m: None, re.IGNORECASE, '')
+
+
+# --- 入口 ---
+
+_CN_FILLERS = r'^(?:请|帮我|提醒我|提醒一下|记得|我要|我需要|我得|需要|要)+'
+_EN_FILLERS = r'^(?:please\s+|remind me to\s+|i need to\s+|i have to\s+|need to\s+|i must\s+)+'
+
+def _split_clauses(text: str, is_chinese: bool):
+    clauses = []
+    for part in re.split(r'[|，,。；;：:!！?？\n]+', text):
+        part = part.strip(' 、.的')
+        if is_chinese:
+            part = re.sub(_CN_FILLERS, '', part)
+            part = re.sub(r'(?:大概|大约|左右|差不多|一下)', '', part).strip()
+        else:
+            part = re.sub(_EN_FILLERS, '', part, flags=re.IGNORECASE)
+            part = re.sub(r'\b(?:on|at|for|about|around)\s*$', '', part, flags=re.IGNORECASE).strip()
+        if part:
+            clauses.append(part)
+    return clauses
+
+def parse_task_locally(user_query: str, now: datetime.datetime = None):
+    """
+    用本地规则解析任务描述。
+
+    :param user_query: 用户输入
+    :param now: 参考时间（默认东八区当前时间）
+    :return: 与LLM解析相同字段的字典，外加 confidence (0~1)
+    """
+    now = now or datetime.datetime.now(pytz.timezone(TIMEZONE)).replace(tzinfo=None)
+    today = now.date()
+    is_chinese = bool(re.search(r'[一-鿿]', user_query))
+    ex = _Extraction(user_query.strip())
+    if is_chinese:
+        _parse_chinese(ex, today)
+    else:
+        _parse_english(ex, today)
+
+    confidence = 1.0
+    start = None
+    if ex.hour is not None:
+        hour = _resolve_hour_chinese(ex) if is_chinese else ex.hour
+        # 24 点按次日零点算
+        start = datetime.datetime.combine(ex.date or today, datetime.time()) + datetime.timedelta(hours=hour, minutes=ex.minute)
+        if ex.date is None and start < now:
+            confidence -= 0.5  # 没说日期且时间已过，可能指明天也可能指今晚，交给LLM
+    elif ex.date is not None:
+        confidence -= 0.35  # 只有日期没有时刻，交给LLM判断
+    elif ex.duration is None:
+        confidence -= 0.3   # 没有任何时间信息，时长需要LLM估算
+
+    clauses = _split_clauses(ex.text, is_chinese)
+    task_name = clauses[0] if clauses else ''
+    details = '，'.join(clauses[1:]) or None
+    if not task_name:
+        confidence -= 0.6
+    elif len(task_name) > (15 if is_chinese else 60):
+        confidence -= 0.3
+    elif len(task_name) == 1 or re.match(r'之前|之后|以前|以后|(?:before|after|until)\b', task_name, re.IGNORECASE):
+        confidence -= 0.5  # 剩下的名字不成词，或是“之前交报告”这类截止时间的残片
+    # 出现多个日期或时刻（例如“三点到五点”），只取最后一个肯定不对
+    if ex.date_count > 1 or ex.clock_count > 1:
+        confidence -= 0.5
+    if details:
+        confidence -= 0.15
+    # 剩余文本里还有数字或时间相关的字，说明有信息没被识别
+    if re.search(rf'{_CN_NUM}\s*[点号月周天]|\d', ''.join(clauses)):
+        confidence -= 0.4
+    confidence -= sum(weight for _, weight in ex.penalties)
+
+    duration = ex.duration or (DEFAULT_DURATION_MINUTES if start else None)
+    if start and not ex.duration:
+        confidence -= 0.1
+    end = start + datetime.timedelta(minutes=duration) if start and duration else None
+    return {
+        "task_name": task_name,
+        "start_time": start.strftime(TIME_FORMAT) if start else None,
+        "end_time": end.strftime(TIME_FORMAT) if end else None,
+        "duration_minutes": duration,
+        "priority": ex.priority or 'Medium',
+        "details": details,
+        "location": ex.location,
+        "confidence": round(max(0.0, min(1.0, confidence)), 2),
+    }
+
+
+# --- 自检用例 ---
+# (输入, 期望)：期望为 None 表示置信度必须低于阈值（交给LLM）；否则列出本地结果必须满足的字段
+CHECK_NOW = datetime.datetime(2025, 9, 19, 10, 0)  # 周五
+CHECK_CASES = [
+    ("明天下午三点开会一小时", {"task_name": "开会", "start_time": "2025-09-20T15:00:00", "duration_minutes": 60}),
+    ("下周二上午10点半在大会议室开周会", {"task_name": "开周会", "start_time": "2025-09-23T10:30:00", "location": "大会议室"}),
+    ("今晚8点健身45分钟", {"task_name": "健身", "start_time": "2025-09-19T20:00:00", "end_time": "2025-09-19T20:45:00"}),
+    ("9月25日下午两点面试候选人", {"task_name": "面试候选人", "start_time": "2025-09-25T14:00:00"}),
+    ("明天下午一点开会", {"task_name": "开会", "start_time": "2025-09-20T13:00:00"}),
+    ("一点半吃饭", {"task_name": "吃饭", "start_time": "2025-09-19T13:30:00"}),
+    ("晚上12点睡觉", {"task_name": "睡觉", "start_time": "2025-09-20T00:00:00"}),
+    ("24点开会", {"task_name": "开会", "start_time": "2025-09-20T00:00:00"}),
+    ("后天下午两点去医院", {"task_name": "去医院", "start_time": "2025-09-21T14:00:00"}),
+    ("紧急重要：修复线上问题 2小时", {"task_name": "修复线上问题", "priority": "High", "duration_minutes": 120}),
+    ("Meeting with Bob tomorrow at 3pm for 1 hour in Room 301",
+     {"task_name": "Meeting with Bob", "start_time": "2025-09-20T15:00:00", "location": "Room 301"}),
+    # 以下必须回退到LLM
+    ("下午三点到五点开会", None),
+    ("15:00-17:00 评审", None),
+    ("把报告写得好一点", None),
+    ("明天下午三点开会一小时，快一点", None),
+    ("两点半之前交报告", None),
+    ("明天交报告", None),
+    ("帮我写周报", None),
+    ("八点开会", None),
+    ("上午九点半开会", None),
+]
+
+def run_checks(threshold: float = CONFIDENCE_THRESHOLD):
+    """运行自检用例，返回失败的 (输入, 期望, 实际结果) 列表"""
+    failures = []
+    for query, expected in CHECK_CASES:
+        result = parse_task_locally(query, now=CHECK_NOW)
+        if expected is None:
+            ok = result['confidence'] < threshold
+        else:
+            ok = result['confidence'] >= threshold and all(result.get(k) == v for k, v in expected.items())
+        if not ok:
+            failures.append((query, expected, result))
+    return failures
+
+
+if __name__ == "__main__":
+    failed = run_checks()
+    for query, expected, result in failed:
+        print(f"❌ {query}\n   期望: {expected}\n   实际: {result}")
+    print(f"[*] 自检完成：{len(CHECK_CASES) - len(failed)}/{len(CHECK_CASES)} 通过。")
+    raise SystemExit(1 if failed else 0)
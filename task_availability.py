@@ -0,0 +1,214 @@
+# task_availability.py (V1 - 按天的空闲时间位图)
+"""
+空闲时间索引模块
+
+每天的占用情况用一个 1440 位的整数位图表示（第 i 位为 1 表示第 i 分钟被占用），
+和任务表一起存放在 availability_days 表中。tasks、recurring_series 和
+recurrence_exceptions 上的触发器会在日程变化时删掉受影响日期的位图
+（update_task_schedule、postpone_task、delete_task、add_task_from_dify、批量导入等都会触发），
+下次查询时只重建这些日期，其余日期直接读缓存。
+
+查空闲时间、统计每日负载、检测冲突都只是对整数做位运算，不需要再扫描任务表。
+跨过零点的任务，零点之后的部分计入第二天（只顺延一天，更长的任务超出部分不计）。
+"""
+
+import datetime
+import sqlite3
+import database_manager
+from task_rescheduler import WORK_WINDOWS
+
+DAY_MINUTES = 24 * 60
+DAY_MASK = (1 << DAY_MINUTES) - 1
+BITMAP_BYTES = DAY_MINUTES // 8
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=None)
+    except (ValueError, TypeError):
+        return None
+
+def _minute_of(value: datetime.datetime, round_up=False):
+    minute = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minute += 1
+    return minute
+
+def _task_span(task):
+    """任务的 (开始, 结束)；没有结束时间时按时长推算，无法确定时返回 None"""
+    start = _parse_time(task['start_time'])
+    end = _parse_time(task['end_time'])
+    if start and not end and task.get('duration_minutes'):
+        end = start + datetime.timedelta(minutes=task['duration_minutes'])
+    if not start or not end or end <= start:
+        return None
+    return start, end
+
+def _previous_day(day: str):
+    return (datetime.date.fromisoformat(day) - datetime.timedelta(days=1)).isoformat()
+
+def _range_mask(start_minute: int, end_minute: int):
+    """[start_minute, end_minute) 这段分钟对应的位掩码"""
+    start_minute, end_minute = max(0, start_minute), min(DAY_MINUTES, end_minute)
+    if start_minute >= end_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+def _window_mask(windows):
+    mask = 0
+    for (start_h, start_m), (end_h, end_m) in windows:
+        mask |= _range_mask(start_h * 60 + start_m, end_h * 60 + end_m)
+    return mask
+
+def _days(start_day: str, end_day: str = None):
+    day = datetime.date.fromisoformat(start_day)
+    last = datetime.date.fromisoformat(end_day or start_day)
+    while day <= last:
+        yield day.isoformat()
+        day += datetime.timedelta(days=1)
+
+
+# --- 位图的构建与缓存 ---
+
+def build_day_bitmap(day: str):
+    """
+    从数据库读取某天已安排的待办任务（含重复任务的单次发生），计算占用位图。
+    前一天开始、跨过零点的任务，零点之后的部分也计入这一天。
+    """
+    midnight = datetime.datetime.combine(datetime.date.fromisoformat(day), datetime.time())
+    bitmap = 0
+    for task in database_manager.get_scheduled_tasks(_previous_day(day)) + database_manager.get_scheduled_tasks(day):
+        span = _task_span(task)
+        if not span or span[1] <= midnight:
+            continue
+        start, end = span
+        start_minute = _minute_of(start) if start >= midnight else 0
+        end_minute = _minute_of(end, round_up=True) if end.date() == midnight.date() else DAY_MINUTES
+        bitmap |= _range_mask(start_minute, end_minute)
+    return bitmap
+
+def get_bitmaps(start_day: str, end_day: str = None):
+    """返回 {日期: 位图}；缓存里没有的日期会当场重建并写回"""
+    days = list(_days(start_day, end_day))
+    with sqlite3.connect(database_manager.DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT day, busy FROM availability_days WHERE day >= ? AND day <= ?;", (days[0], days[-1]))
+        bitmaps = {day: int.from_bytes(busy, 'little') for day, busy in cursor.fetchall()}
+        missing = [day for day in days if day not in bitmaps]
+        if missing:
+            # 先拿到写锁再读任务，保证重建期间没有其他写入让刚算出的位图过期
+            cursor.execute("BEGIN IMMEDIATE;")
+            rows = []
+            for day in missing:
+                bitmaps[day] = build_day_bitmap(day)
+                rows.append((day, bitmaps[day].to_bytes(BITMAP_BYTES, 'little'), bitmaps[day].bit_count()))
+            cursor.executemany("INSERT OR REPLACE INTO availability_days (day, busy, busy_minutes) VALUES (?, ?, ?);", rows)
+    return {day: bitmaps[day] for day in days}
+
+def invalidate(start_day: str = None, end_day: str = None):
+    """丢弃缓存的位图（不给日期时清空全部），下次查询时重建"""
+    with sqlite3.connect(database_manager.DB_PATH) as conn:
+        if start_day is None:
+            conn.execute("DELETE FROM availability_days;")
+        else:
+            conn.execute("DELETE FROM availability_days WHERE day >= ? AND day <= ?;", (start_day, end_day or start_day))
+
+
+# --- 查询接口 ---
+
+def _runs_of(free: int, length: int):
+    """返回一个位图：第 i 位为 1 表示从第 i 分钟起连续 length 分钟都空闲"""
+    runs, covered = free, 1
+    while covered < length:
+        step = min(covered, length - covered)
+        runs &= runs >> step
+        covered += step
+    return runs
+
+def find_free_slots(duration_minutes: int, start_day: str, end_day: str = None,
+                    windows=WORK_WINDOWS, earliest: datetime.datetime = None, limit: int = None):
+    """
+    在 [start_day, end_day] 的工作时间内查找能放下 duration_minutes 的空闲时间段。
+
+    :param windows: 每天可用的时间窗口，默认与排程使用的工作时间一致
+    :param earliest: 不早于这个时间（例如传入当前时间，跳过已经过去的部分）
+    :return: [(开始, 结束), ...]，每一项是一整段足够长的空闲时间，按时间排序
+    """
+    if not duration_minutes or duration_minutes <= 0:
+        return []
+    window_mask = _window_mask(windows)
+    slots = []
+    for day, busy in get_bitmaps(start_day, end_day).items():
+        date = datetime.date.fromisoformat(day)
+        free = ~busy & window_mask
+        if earliest and earliest.date() >= date:
+            if earliest.date() > date:
+                continue
+            free &= ~_range_mask(0, _minute_of(earliest, round_up=True))
+        candidates = _runs_of(free, duration_minutes)
+        while candidates:
+            gap_start = (candidates & -candidates).bit_length() - 1
+            # 这段空闲一直延续到下一个非空闲分钟
+            blocked = ~free & ~((1 << gap_start) - 1) & DAY_MASK
+            gap_end = (blocked & -blocked).bit_length() - 1 if blocked else DAY_MINUTES
+            midnight = datetime.datetime.combine(date, datetime.time())
+            slots.append(((midnight + datetime.timedelta(minutes=gap_start)).strftime(TIME_FORMAT),
+                          (midnight + datetime.timedelta(minutes=gap_end)).strftime(TIME_FORMAT)))
+            if limit and len(slots) >= limit:
+                return slots
+            candidates &= ~((1 << gap_end) - 1)
+    return slots
+
+def get_daily_load(start_day: str, end_day: str = None, windows=WORK_WINDOWS):
+    """返回 {日期: {'busy_minutes': 全天占用分钟, 'free_work_minutes': 工作时间内的空闲分钟}}"""
+    window_mask = _window_mask(windows)
+    return {
+        day: {'busy_minutes': busy.bit_count(), 'free_work_minutes': (~busy & window_mask).bit_count()}
+        for day, busy in get_bitmaps(start_day, end_day).items()
+    }
+
+def find_conflicts(start_time: str, end_time: str, exclude_id=None):
+    """
+    返回与 [start_time, end_time) 重叠的已安排待办任务。
+
+    先用位图判断是否有重叠，只有确实冲突时才读取当天的任务来确定是哪几个。
+    """
+    start, end = _parse_time(start_time), _parse_time(end_time)
+    if not start or not end or end <= start:
+        return []
+    last_day = (end - datetime.timedelta(minutes=1)).date()
+    bitmaps = get_bitmaps(start.date().isoformat(), last_day.isoformat())
+    overlapping_days = []
+    for day, busy in bitmaps.items():
+        date = datetime.date.fromisoformat(day)
+        day_start = _minute_of(start) if date == start.date() else 0
+        day_end = _minute_of(end, round_up=True) if date == end.date() else DAY_MINUTES
+        if busy & _range_mask(day_start, day_end):
+            overlapping_days.append(day)
+
+    # 占用某天的任务可能是前一天开始、跨过零点的
+    query_days = sorted({d for day in overlapping_days for d in (_previous_day(day), day)})
+    conflicts = []
+    seen = set()
+    for day in query_days:
+        for task in database_manager.get_scheduled_tasks(day):
+            if task['id'] == exclude_id or task['id'] in seen:
+                continue
+            span = _task_span(task)
+            if span and span[0] < end and span[1] > start:
+                seen.add(task['id'])
+                conflicts.append(task)
+    return conflicts
+
+
+if __name__ == "__main__":
+    # 命令行：输出今天起一周的负载和第一个能放下一小时任务的空闲时间
+    today = datetime.date.today()
+    week_end = (today + datetime.timedelta(days=6)).isoformat()
+    database_manager.init_db()
+    for day, load in get_daily_load(today.isoformat(), week_end).items():
+        print(f"{day}: 已占用 {load['busy_minutes']} 分钟，工作时间内空闲 {load['free_work_minutes']} 分钟")
+    print("下一个60分钟空闲时段:", find_free_slots(60, today.isoformat(), week_end, earliest=datetime.datetime.now(), limit=1))
@@ -0,0 +1,290 @@
+# task_io.py (V1 - 批量导入导出)
+"""
+任务批量导入导出模块
+
+导入：逐行读取 NDJSON / CSV，校验后按块在事务中写入，内存占用与文件大小无关。
+导出：直接遍历数据库游标流式写出 NDJSON / CSV / iCalendar(.ics)，不经过 get_all_tasks。
+.ics 中已安排时间的任务是 VEVENT，未安排时间的父子任务是 VTODO，子任务用 RELATED-TO 指向父任务。
+
+父子关系在导入时通过原始ID映射重建：文件中的 id / parent_task_id 只用于关联，
+写入数据库时使用新的自增ID，映射表放在 SQLite 临时表中而不是 Python 内存里。
+"""
+
+import csv
+import datetime
+import json
+import sqlite3
+import database_manager
+
+CHUNK_SIZE = 1000
+VALID_PRIORITIES = ('High', 'Medium', 'Low')
+VALID_STATUSES = ('pending', 'completed')
+# iCalendar 的 PRIORITY：1 最高，9 最低
+ICS_PRIORITY = {'High': 1, 'Medium': 5, 'Low': 9}
+EXPORT_FIELDS = (
+    'id', 'task_name', 'start_time', 'end_time', 'duration_minutes', 'priority',
+    'status', 'details', 'location', 'parent_task_id', 'created_at',
+)
+
+
+# --- 导入 ---
+
+def _empty_to_none(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+def _validate_time(value):
+    value = _empty_to_none(value)
+    if value is None:
+        return None
+    datetime.datetime.fromisoformat(value)
+    return value
+
+def _optional_time(value):
+    """可选的时间字段（如 created_at）：格式不对时丢弃，由数据库使用默认值"""
+    try:
+        return _validate_time(value)
+    except (ValueError, TypeError):
+        return None
+
+def _validate_record(record: dict):
+    """校验并规范化一条导入记录，返回 (原始ID, 原始父ID, 写库参数)。校验失败抛出 ValueError。"""
+    task_name = _empty_to_none(record.get('task_name'))
+    if not task_name:
+        raise ValueError("task_name 不能为空")
+    priority = _empty_to_none(record.get('priority')) or 'Medium'
+    if priority not in VALID_PRIORITIES:
+        raise ValueError(f"无效的优先级: {priority}")
+    status = _empty_to_none(record.get('status')) or 'pending'
+    if status not in VALID_STATUSES:
+        raise ValueError(f"无效的状态: {status}")
+    duration = _empty_to_none(record.get('duration_minutes'))
+    duration = int(duration) if duration is not None else None
+
+    # 兼容 add_task_from_dify 使用的嵌套 task_details 结构
+    task_details_obj = record.get('task_details') or {}
+    details = _empty_to_none(record.get('details', task_details_obj.get('description')))
+    location = _empty_to_none(record.get('location', task_details_obj.get('location')))
+
+    source_id = _empty_to_none(record.get('id'))
+    source_parent_id = _empty_to_none(record.get('parent_task_id'))
+    values = (
+        task_name, _validate_time(record.get('start_time')), _validate_time(record.get('end_time')),
+        duration, priority, status, details, location, _optional_time(record.get('created_at')),
+    )
+    return (str(source_id) if source_id is not None else None,
+            str(source_parent_id) if source_parent_id is not None else None,
+            values)
+
+def _read_ndjson(file_obj):
+    for line_no, line in enumerate(file_obj, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"❌ 第 {line_no} 行不是合法的JSON，已跳过: {e}")
+
+def _read_csv(file_obj):
+    yield from csv.DictReader(file_obj)
+
+def _import_records(records, chunk_size: int = CHUNK_SIZE):
+    """按块写入记录。子任务的父ID在写入时根据 原始ID -> 新ID 的映射重建。"""
+    insert_sql = """
+    INSERT INTO tasks (task_name, start_time, end_time, duration_minutes, priority, status, details, location, created_at, parent_task_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?);
+    """
+    stats = {'imported': 0, 'skipped': 0}
+    with sqlite3.connect(database_manager.DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS import_id_map (source_id TEXT PRIMARY KEY, new_id INTEGER NOT NULL);")
+        cursor.execute("DELETE FROM import_id_map;")
+        pending_in_chunk = 0
+        for line_no, record in enumerate(records, start=1):
+            try:
+                source_id, source_parent_id, values = _validate_record(record)
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"❌ 第 {line_no} 条记录校验失败，已跳过: {e}")
+                stats['skipped'] += 1
+                continue
+            parent_id = None
+            if source_parent_id is not None:
+                cursor.execute("SELECT new_id FROM import_id_map WHERE source_id = ?;", (source_parent_id,))
+                mapped = cursor.fetchone()
+                if mapped is None:
+                    print(f"❌ 第 {line_no} 条记录的父任务 {source_parent_id} 不存在（父任务需出现在子任务之前），已跳过。")
+                    stats['skipped'] += 1
+                    continue
+                parent_id = mapped[0]
+            cursor.execute(insert_sql, values + (parent_id,))
+            if source_id is not None:
+                cursor.execute("INSERT OR REPLACE INTO import_id_map (source_id, new_id) VALUES (?, ?);", (source_id, cursor.lastrowid))
+            stats['imported'] += 1
+            pending_in_chunk += 1
+            if pending_in_chunk >= chunk_size:
+                conn.commit()
+                pending_in_chunk = 0
+    print(f"[*] 导入完成：成功 {stats['imported']} 条，跳过 {stats['skipped']} 条。")
+    return stats
+
+def import_ndjson(path: str, chunk_size: int = CHUNK_SIZE):
+    """从 NDJSON 文件导入任务，每行一个JSON对象"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return _import_records(_read_ndjson(f), chunk_size)
+
+def import_csv(path: str, chunk_size: int = CHUNK_SIZE):
+    """从带表头的 CSV 文件导入任务"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return _import_records(_read_csv(f), chunk_size)
+
+
+# --- 导出 ---
+
+def _iter_tasks(where_sql: str = "", chunk_size: int = CHUNK_SIZE):
+    """以游标分块遍历任务表。按 id 排序，保证父任务先于子任务输出。"""
+    with sqlite3.connect(database_manager.DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(EXPORT_FIELDS)} FROM tasks {where_sql} ORDER BY id;")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(EXPORT_FIELDS, row))
+
+def export_ndjson(path: str):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for task in _iter_tasks():
+            f.write(json.dumps(task, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    print(f"[*] 已导出 {count} 个任务到 {path}")
+    return count
+
+def export_csv(path: str):
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for task in _iter_tasks():
+            writer.writerow(task)
+            count += 1
+    print(f"[*] 已导出 {count} 个任务到 {path}")
+    return count
+
+def _ics_escape(text) -> str:
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _ics_time(value: str) -> str:
+    return datetime.datetime.fromisoformat(value).strftime('%Y%m%dT%H%M%S')
+
+def _ics_fold(line: str):
+    """按 RFC 5545 把超过75字节的行折叠"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, current, size = [], '', 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > (75 if not parts else 74):
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+def _task_uid(task_id) -> str:
+    return f"tasky-task-{task_id}@tasky"
+
+# 已安排时间的任务，以及父子关系中的任一方（未安排时间的父任务、子任务导出为待办）
+_ICS_WHERE = (
+    "WHERE start_time IS NOT NULL OR parent_task_id IS NOT NULL "
+    "OR EXISTS (SELECT 1 FROM tasks AS child WHERE child.parent_task_id = tasks.id)"
+)
+
+def _ics_component(task, stamp):
+    """已安排时间的任务生成 VEVENT，未安排时间的生成 VTODO；无法解析时间时返回 None"""
+    try:
+        start = _ics_time(task['start_time']) if task['start_time'] else None
+        end = _ics_time(task['end_time']) if start and task['end_time'] else None
+    except (ValueError, TypeError):
+        return None
+    component = "VEVENT" if start else "VTODO"
+    lines = [f"BEGIN:{component}", f"UID:{_task_uid(task['id'])}", f"DTSTAMP:{stamp}"]
+    if start:
+        lines.append(f"DTSTART:{start}")
+        if end:
+            lines.append(f"DTEND:{end}")
+        elif task['duration_minutes']:
+            lines.append(f"DURATION:PT{task['duration_minutes']}M")
+    lines.append(f"SUMMARY:{_ics_escape(task['task_name'])}")
+    if task['details']:
+        lines.append(f"DESCRIPTION:{_ics_escape(task['details'])}")
+    if task['location']:
+        lines.append(f"LOCATION:{_ics_escape(task['location'])}")
+    if task['priority']:
+        lines.append(f"PRIORITY:{ICS_PRIORITY.get(task['priority'], 0)}")
+    if start:
+        # VEVENT 没有 COMPLETED 状态，已完成的日程用分类标记
+        lines.append("STATUS:CONFIRMED")
+        if task['status'] == 'completed':
+            lines.append("CATEGORIES:COMPLETED")
+    else:
+        lines.append(f"STATUS:{'COMPLETED' if task['status'] == 'completed' else 'NEEDS-ACTION'}")
+    if task['parent_task_id'] is not None:
+        lines.append(f"RELATED-TO;RELTYPE=PARENT:{_task_uid(task['parent_task_id'])}")
+    lines.append(f"END:{component}")
+    return lines
+
+def export_ics(path: str):
+    """
+    导出 iCalendar 文件：已安排时间的任务为 VEVENT；
+    未安排时间的父任务和子任务为 VTODO，这样子任务的 RELATED-TO 总能指向文件里的父任务
+    """
+    count = 0
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for line in ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Tasky//Tasky Export//ZH"):
+            f.write(line + '\r\n')
+        for task in _iter_tasks(_ICS_WHERE):
+            lines = _ics_component(task, stamp)
+            if not lines:
+                continue
+            for line in lines:
+                f.write(_ics_fold(line))
+            count += 1
+        f.write("END:VCALENDAR\r\n")
+    print(f"[*] 已导出 {count} 个日程和待办到 {path}")
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    usage = "用法: python task_io.py import|export <文件路径(.ndjson/.jsonl/.csv/.ics)>"
+    if len(sys.argv) != 3 or sys.argv[1] not in ('import', 'export'):
+        print(usage)
+        sys.exit(1)
+    action, file_path = sys.argv[1], sys.argv[2]
+    extension = file_path.rsplit('.', 1)[-1].lower()
+    database_manager.init_db()
+    if action == 'import' and extension in ('ndjson', 'jsonl'):
+        import_ndjson(file_path)
+    elif action == 'import' and extension == 'csv':
+        import_csv(file_path)
+    elif action == 'export' and extension in ('ndjson', 'jsonl'):
+        export_ndjson(file_path)
+    elif action == 'export' and extension == 'csv':
+        export_csv(file_path)
+    elif action == 'export' and extension == 'ics':
+        export_ics(file_path)
+    else:
+        print(usage)
+        sys.exit(1)
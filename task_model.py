@@ -0,0 +1,138 @@
+# task_model.py (V1 - 紧凑的任务数据模型)
+"""
+任务数据模型
+
+Task 是一个使用 __slots__ 的轻量记录，替代数据库层原先逐行生成的字典；
+TaskBatch 按列存储批量查询结果，避免大结果集下每行一个对象的内存开销。
+两者都保留了 task['id'] / task.get('details') 这样的读取方式，方便界面代码直接使用。
+"""
+
+from array import array
+from functools import lru_cache
+
+TASK_FIELDS = (
+    'id', 'task_name', 'start_time', 'end_time', 'duration_minutes', 'priority',
+    'status', 'details', 'location', 'parent_task_id', 'created_at',
+)
+
+# LLM Prompt 需要的字段子集
+SCHEDULE_FIELDS = ('task_name', 'duration_minutes', 'priority')
+EVENT_FIELDS = ('task_name', 'start_time', 'end_time')
+
+
+class Task:
+    """一条任务记录。查询中没有选取的字段为 None。"""
+    __slots__ = TASK_FIELDS
+
+    def __init__(self, **fields):
+        for name in TASK_FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_values(cls, columns, values):
+        return _task_builder(tuple(columns))(values)
+
+    # --- 兼容字典式读取 ---
+    def __getitem__(self, key):
+        if key not in TASK_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in TASK_FIELDS:
+            return default
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"Task(id={self.id!r}, task_name={self.task_name!r}, status={self.status!r})"
+
+    # --- 转换为 JSON 可序列化的结构 ---
+    def to_dict(self, fields=TASK_FIELDS):
+        return {name: getattr(self, name) for name in fields}
+
+    def to_schedule_json(self):
+        """排程 Prompt 中“待办任务列表”的结构"""
+        return self.to_dict(SCHEDULE_FIELDS)
+
+    def to_event_json(self):
+        """排程 Prompt 中“已有日程”的结构"""
+        return self.to_dict(EVENT_FIELDS)
+
+
+@lru_cache(maxsize=128)
+def _task_builder(columns):
+    """
+    为一组查询列生成构造函数：每个字段直接按下标赋值一次，没选取的字段赋 None，
+    不在 TASK_FIELDS 中的列（例如分组查询的 group_id）忽略。结果按列组合缓存。
+    """
+    lines = ["def build(values):", "    task = new(Task)"]
+    for name in TASK_FIELDS:
+        value = f"values[{columns.index(name)}]" if name in columns else "None"
+        lines.append(f"    task.{name} = {value}")
+    lines.append("    return task")
+    namespace = {'Task': Task, 'new': Task.__new__}
+    exec("\n".join(lines), namespace)
+    return namespace['build']
+
+@lru_cache(maxsize=128)
+def _builder_for_description(description):
+    return _task_builder(tuple(column[0] for column in description))
+
+def task_row_factory(cursor, row):
+    """sqlite3 的 row_factory：直接把查询结果构造成 Task，不经过中间字典"""
+    return _builder_for_description(cursor.description)(row)
+
+
+class TaskBatch:
+    """按列存储的一批任务。迭代或下标访问时才按需构造 Task。"""
+    __slots__ = ('columns', '_data', '_length')
+
+    def __init__(self, columns, data, length):
+        self.columns = tuple(columns)
+        self._data = data
+        self._length = length
+
+    @classmethod
+    def empty(cls, columns=TASK_FIELDS):
+        return cls(columns, {name: [] for name in columns}, 0)
+
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size: int = 1000):
+        """分块读取游标，把结果追加到各列中"""
+        columns = [description[0] for description in cursor.description]
+        data = {name: (array('q') if name == 'id' else []) for name in columns}
+        column_lists = [data[name] for name in columns]
+        length = 0
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                for column, value in zip(column_lists, row):
+                    column.append(value)
+            length += len(rows)
+        return cls(columns, data, length)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return Task.from_values(self.columns, [self._data[name][index] for name in self.columns])
+
+    def __iter__(self):
+        columns = self.columns
+        for values in zip(*(self._data[name] for name in columns)):
+            yield Task.from_values(columns, values)
+
+    def column(self, name):
+        """直接返回某一列，适合做统计或分组而不必构造 Task"""
+        return self._data[name]
+
+    def to_records(self, fields=None):
+        """转换为字典列表（用于 JSON 序列化）"""
+        fields = fields or self.columns
+        return [dict(zip(fields, values)) for values in zip(*(self._data[name] for name in fields))]
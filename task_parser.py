@@ -4,6 +4,7 @@ import datetime
 import pytz # 导入时区库
 import os  # 导入os模块
 from dotenv import load_dotenv  # 导入dotenv库
+import quick_parser
 import os
 
 # 获取当前文件所在的文件夹的绝对路径
@@ -16,6 +17,8 @@ DB_PATH = os.path.join(_CURRENT_DIR, 'tasky.db')
 # --- 1. 加载环境变量 ---
 load_dotenv() # 这行代码会自动寻找并加载 .env 文件中的变量
 DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+# 本地规则解析的置信度达到这个值就直接采用，否则再调用LLM
+LOCAL_CONFIDENCE_THRESHOLD = quick_parser.CONFIDENCE_THRESHOLD
 
 
 # --- 2. 从环境变量中安全地获取API Key ---
@@ -119,6 +122,16 @@ def parse_task_with_llm(user_query: str):
         return None
 
 
+def parse_task(user_query: str, threshold: float = LOCAL_CONFIDENCE_THRESHOLD):
+    """先用本地规则快速解析，置信度不足时才调用LLM"""
+    local_result = quick_parser.parse_task_locally(user_query)
+    if local_result['confidence'] >= threshold:
+        print(f"[*] 本地规则解析成功 (置信度 {local_result['confidence']})，跳过API调用。")
+        return local_result
+    print(f"[*] 本地规则解析置信度 {local_result['confidence']} 低于 {threshold}，改用LLM解析。")
+    return parse_task_with_llm(user_query)
+
+
 if __name__ == "__main__":
     # 示例用法
     user_input = input("请输入您的任务描述: ")
@@ -0,0 +1,131 @@
+# task_recurrence.py (V1 - 重复任务规则与按需展开)
+"""
+重复任务模块
+
+一个重复系列（如每日站会、每周周报）在数据库中只存一行规则，
+查询某个日期范围时才按规则展开出具体的发生日期；单次发生的例外（已完成、顺延、
+改期、取消）以 (系列ID, 发生日期) 为键稀疏存储，展开后再覆盖上去。
+
+本模块只负责规则计算，不访问数据库；展开结果按 (规则, 日期窗口) 缓存。
+"""
+
+import calendar
+import datetime
+from collections import OrderedDict
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+EXCEPTION_STATUSES = ('completed', 'postponed', 'edited', 'cancelled')
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+_CACHE_SIZE = 512
+_expansion_cache = OrderedDict()
+
+
+# --- 单次发生的标识 ---
+
+def occurrence_key(series_id: int, occurrence_date: str) -> str:
+    """单次发生的ID，例如 "r3:2025-09-19"，可以像任务ID一样传给 database_manager"""
+    return f"r{series_id}:{occurrence_date}"
+
+def parse_occurrence_key(key):
+    """解析单次发生的ID，不是该格式时返回 None"""
+    if not isinstance(key, str) or not key.startswith('r') or ':' not in key:
+        return None
+    series_part, date_part = key[1:].split(':', 1)
+    try:
+        return int(series_part), datetime.date.fromisoformat(date_part).isoformat()
+    except ValueError:
+        return None
+
+
+# --- 规则展开 ---
+
+def _rule_key(series):
+    return (
+        series['id'], series['start_date'], series['freq'], series['interval'] or 1,
+        series['by_weekday'] or '', series['until_date'] or '',
+    )
+
+def _parse_weekdays(series, start_date):
+    if series['by_weekday']:
+        return sorted({int(day) for day in str(series['by_weekday']).split(',') if day.strip() != ''})
+    return [start_date.weekday()]
+
+def _expand_daily(start, first, last, interval):
+    offset = max(0, (first - start).days)
+    # 对齐到不早于 first 的第一个发生日期，不从系列开头逐日迭代
+    step = -(-offset // interval) * interval
+    day = start + datetime.timedelta(days=step)
+    while day <= last:
+        yield day
+        day += datetime.timedelta(days=interval)
+
+def _expand_weekly(start, first, last, interval, weekdays):
+    start_week = start - datetime.timedelta(days=start.weekday())
+    first_week = max(start_week, first - datetime.timedelta(days=first.weekday()))
+    weeks = (first_week - start_week).days // 7
+    week = start_week + datetime.timedelta(weeks=-(-weeks // interval) * interval)
+    while week <= last:
+        for weekday in weekdays:
+            day = week + datetime.timedelta(days=weekday)
+            if start <= day and first <= day <= last:
+                yield day
+        week += datetime.timedelta(weeks=interval)
+
+def _expand_monthly(start, first, last, interval):
+    months = max(0, (first.year - start.year) * 12 + first.month - start.month)
+    months = -(-months // interval) * interval
+    while True:
+        year, month = divmod(start.month - 1 + months, 12)
+        year, month = start.year + year, month + 1
+        if datetime.date(year, month, 1) > last:
+            break
+        # 没有这一天的月份（如2月30日）直接跳过
+        if start.day <= calendar.monthrange(year, month)[1]:
+            day = datetime.date(year, month, start.day)
+            if first <= day <= last:
+                yield day
+        months += interval
+
+def expand_dates(series, range_start: str, range_end: str):
+    """
+    返回系列在 [range_start, range_end] 内所有发生日期（"YYYY-MM-DD" 列表），结果会被缓存。
+
+    :param series: 含 id/start_date/freq/interval/by_weekday/until_date 的系列记录
+    """
+    cache_key = (_rule_key(series), range_start, range_end)
+    if cache_key in _expansion_cache:
+        _expansion_cache.move_to_end(cache_key)
+        return _expansion_cache[cache_key]
+
+    start = datetime.date.fromisoformat(series['start_date'])
+    first = max(start, datetime.date.fromisoformat(range_start))
+    last = datetime.date.fromisoformat(range_end)
+    if series['until_date']:
+        last = min(last, datetime.date.fromisoformat(series['until_date']))
+    interval = max(1, series['interval'] or 1)
+
+    dates = []
+    if first <= last:
+        if series['freq'] == 'DAILY':
+            days = _expand_daily(start, first, last, interval)
+        elif series['freq'] == 'WEEKLY':
+            days = _expand_weekly(start, first, last, interval, _parse_weekdays(series, start))
+        elif series['freq'] == 'MONTHLY':
+            days = _expand_monthly(start, first, last, interval)
+        else:
+            raise ValueError(f"不支持的重复频率: {series['freq']}")
+        dates = [day.isoformat() for day in days]
+
+    _expansion_cache[cache_key] = dates
+    if len(_expansion_cache) > _CACHE_SIZE:
+        _expansion_cache.popitem(last=False)
+    return dates
+
+def occurrence_times(series, occurrence_date: str):
+    """按系列的时刻和时长计算某次发生的 (开始, 结束)；没有固定时刻的系列返回 (None, None)"""
+    if not series['start_clock']:
+        return None, None
+    start = datetime.datetime.fromisoformat(f"{occurrence_date}T{series['start_clock']}")
+    end = start + datetime.timedelta(minutes=series['duration_minutes'] or 0)
+    return start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)
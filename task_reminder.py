@@ -0,0 +1,224 @@
+# task_reminder.py (V1 - 任务提醒服务)
+"""
+任务提醒模块
+
+ReminderService 只通过 start_time 索引加载“接下来一个时间窗口”内的待办任务
+（包括重复任务的单次发生，ID 为 task_recurrence.occurrence_key），放进按提醒时间排序的最小堆；日程变化（update_task_schedule、postpone_task、
+delete_task 等）通过 database_manager 的监听回调推送过来，不需要重新扫描任务表。
+到点后的提醒交给可替换的 sink 发送（打印日志，或 POST 到本地 webhook）。
+
+提醒服务通常单独运行（python task_reminder.py），收不到 Streamlit 进程里的回调，
+所以每轮循环还会检查数据库的 PRAGMA data_version：其他连接提交过写入时，
+重新读取已加载的时间窗口，把新增、改期和删除的任务同步进堆里。
+"""
+
+import datetime
+import heapq
+import itertools
+import sqlite3
+import threading
+import requests
+import database_manager
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+DEFAULT_WEBHOOK_URL = "http://127.0.0.1:8765/reminders"
+# 检查其他进程写入的间隔（秒）
+POLL_SECONDS = 5
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=None)
+    except (ValueError, TypeError):
+        return None
+
+
+# --- 提醒发送端 ---
+
+class LogSink:
+    """把提醒打印到控制台"""
+
+    def send(self, task, remind_at: datetime.datetime):
+        location = f" @ {task['location']}" if task.get('location') else ""
+        print(f"⏰ 提醒: '{task['task_name']}' 将于 {task['start_time']} 开始{location} (任务ID: {task['id']})")
+
+
+class WebhookSink:
+    """把提醒以JSON形式POST到一个webhook地址（默认是本地的占位服务）"""
+
+    def __init__(self, url: str = DEFAULT_WEBHOOK_URL, timeout: int = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, task, remind_at: datetime.datetime):
+        payload = {
+            "task_id": task['id'],
+            "task_name": task['task_name'],
+            "start_time": task['start_time'],
+            "end_time": task.get('end_time'),
+            "location": task.get('location'),
+            "remind_at": remind_at.strftime(TIME_FORMAT),
+        }
+        try:
+            response = requests.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ 发送提醒到 {self.url} 失败: {e}")
+
+
+# --- 提醒服务 ---
+
+class ReminderService:
+    """
+    基于最小堆的提醒服务。
+
+    :param sink: 提醒发送端，需要实现 send(task, remind_at)
+    :param lead_minutes: 提前多少分钟提醒
+    :param window_hours: 每次从数据库预加载多长时间范围内的任务
+    """
+
+    def __init__(self, sink=None, lead_minutes: int = 10, window_hours: int = 24):
+        self.sink = sink or LogSink()
+        self.lead = datetime.timedelta(minutes=lead_minutes)
+        self.window = datetime.timedelta(hours=window_hours)
+        self._heap = []            # (提醒时间, 序号, 任务ID, 开始时间字符串)；序号避免比较整数ID和发生键
+        self._sequence = itertools.count()
+        self._active = {}          # 任务ID -> 当前有效的开始时间，用于识别堆里的过期条目
+        self._sent = set()         # 已发出的 (任务ID, 开始时间)，任务开始后才清理，防止同步时重复提醒
+        self._loaded_until = None  # 已加载窗口的右边界（按开始时间）
+        self._watch_conn = None    # 只用来读取 data_version 的长连接
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self, now=None):
+        """注册日程变更监听并加载第一个时间窗口"""
+        database_manager.add_schedule_listener(self.on_schedule_change)
+        with self._lock:
+            self._watch_conn = sqlite3.connect(database_manager.DB_PATH, check_same_thread=False)
+            self._data_version = self._read_data_version()
+            self._extend_window(now or datetime.datetime.now())
+
+    def stop(self):
+        database_manager.remove_schedule_listener(self.on_schedule_change)
+        with self._lock:
+            if self._watch_conn:
+                self._watch_conn.close()
+                self._watch_conn = None
+        self._stop.set()
+        self._wakeup.set()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._active)
+
+    def _push(self, task_id, start_time: str):
+        start = _parse_time(start_time)
+        if not start or (task_id, start_time) in self._sent:
+            return
+        self._active[task_id] = start_time
+        heapq.heappush(self._heap, (start - self.lead, next(self._sequence), task_id, start_time))
+
+    def _extend_window(self, now: datetime.datetime):
+        """窗口剩余不足一半时，只加载新增的那一段时间范围"""
+        window_end = now + self.window
+        if self._loaded_until and self._loaded_until - now >= self.window / 2:
+            return
+        window_start = max(self._loaded_until or now, now)
+        tasks = database_manager.get_upcoming_tasks(window_start.strftime(TIME_FORMAT), window_end.strftime(TIME_FORMAT))
+        for task in tasks:
+            self._push(task['id'], task['start_time'])
+        self._loaded_until = window_end
+
+    def _read_data_version(self):
+        return self._watch_conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def _sync_external_changes(self, now: datetime.datetime):
+        """其他连接写过数据库时，重新读取已加载窗口并与堆里的提醒对齐"""
+        if not self._watch_conn or not self._loaded_until:
+            return
+        version = self._read_data_version()
+        if version == self._data_version:
+            return
+        self._data_version = version
+        tasks = database_manager.get_upcoming_tasks(now.strftime(TIME_FORMAT), self._loaded_until.strftime(TIME_FORMAT))
+        current = {task['id']: task['start_time'] for task in tasks}
+        for task_id, start_time in list(self._active.items()):
+            # 已经开始的任务不在这次查询的范围里，保留给 dispatch_due 处理
+            if task_id not in current and _parse_time(start_time) >= now:
+                del self._active[task_id]
+        for task_id, start_time in current.items():
+            if self._active.get(task_id) != start_time:
+                self._push(task_id, start_time)
+
+    def on_schedule_change(self, task_id, start_time):
+        """database_manager 的日程变更回调：只调整这一个任务（或重复任务的单次发生）的提醒"""
+        with self._lock:
+            self._active.pop(task_id, None)
+            start = _parse_time(start_time)
+            # 超出已加载窗口的任务等窗口滑动时再从数据库读取
+            if start and self._loaded_until and datetime.datetime.now() <= start < self._loaded_until:
+                self._push(task_id, start_time)
+        self._wakeup.set()
+
+    def dispatch_due(self, now=None):
+        """发送所有已到提醒时间的提醒，返回发送的数量"""
+        now = now or datetime.datetime.now()
+        due = []
+        with self._lock:
+            self._sync_external_changes(now)
+            self._extend_window(now)
+            while self._heap and self._heap[0][0] <= now:
+                remind_at, _, task_id, start_time = heapq.heappop(self._heap)
+                if self._active.get(task_id) != start_time:
+                    continue  # 已被改期、顺延或删除的过期条目
+                del self._active[task_id]
+                self._sent.add((task_id, start_time))
+                due.append((remind_at, task_id, start_time))
+            self._sent = {(task_id, start_time) for task_id, start_time in self._sent if _parse_time(start_time) >= now}
+
+        sent = 0
+        for remind_at, task_id, start_time in due:
+            # 按主键再确认一次，避免提醒已完成或被外部修改的任务
+            task = database_manager.get_task(task_id)
+            if not task or task['status'] != 'pending' or task['start_time'] != start_time:
+                continue
+            try:
+                self.sink.send(task, remind_at)
+                sent += 1
+            except Exception as e:
+                print(f"❌ 发送任务ID {task_id} 的提醒失败: {e}")
+        return sent
+
+    def _seconds_until_next(self, now, max_sleep):
+        with self._lock:
+            while self._heap and self._active.get(self._heap[0][2]) != self._heap[0][3]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return max_sleep
+            return min(max(0.0, (self._heap[0][0] - now).total_seconds()), max_sleep)
+
+    def run(self, max_sleep: float = POLL_SECONDS):
+        """阻塞运行：睡到下一个提醒时间（最多 max_sleep 秒，以便发现其他进程的修改），直到调用 stop()"""
+        self.start()
+        print(f"[*] 提醒服务已启动，当前窗口内有 {self.pending_count()} 个待提醒任务。")
+        while not self._stop.is_set():
+            self.dispatch_due()
+            self._wakeup.wait(self._seconds_until_next(datetime.datetime.now(), max_sleep))
+            self._wakeup.clear()
+
+    def run_in_background(self, max_sleep: float = POLL_SECONDS):
+        thread = threading.Thread(target=self.run, args=(max_sleep,), daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    service = ReminderService()
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.stop()
@@ -0,0 +1,188 @@
+# task_rescheduler.py (V1 - 增量重排)
+"""
+增量重排模块
+
+当任务被顺延、提前完成、删除或修改时长时，只在受影响当天的剩余空闲时间里
+重新安排受影响的任务，其余日程保持不变，并且只写回真正发生变化的行。
+整个过程在本地完成，不调用LLM。
+"""
+
+import datetime
+import database_manager
+
+# 与 task_scheduler 中约定的工作时间保持一致：上午9-12点，下午2-8点
+WORK_WINDOWS = [((9, 0), (12, 0)), ((14, 0), (20, 0))]
+PRIORITY_ORDER = {'High': 0, 'Medium': 1, 'Low': 2}
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def _parse_time(value):
+    """把数据库里的ISO时间字符串解析为不带时区的datetime，失败时返回None"""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=None)
+    except (ValueError, TypeError):
+        return None
+
+def _format_time(value: datetime.datetime):
+    return value.strftime(TIME_FORMAT)
+
+def _busy_intervals(scheduled_tasks, exclude_ids=()):
+    """把已安排的任务转换为 (开始, 结束) 区间列表"""
+    intervals = []
+    for task in scheduled_tasks:
+        if task['id'] in exclude_ids:
+            continue
+        start = _parse_time(task['start_time'])
+        end = _parse_time(task['end_time'])
+        if start and not end and task.get('duration_minutes'):
+            end = start + datetime.timedelta(minutes=task['duration_minutes'])
+        if start and end:
+            intervals.append((start, end))
+    return sorted(intervals)
+
+def _free_slots(day: datetime.date, busy, window_start: datetime.datetime, window_end=None):
+    """计算某天工作时间内、从 window_start 开始的空闲区间"""
+    slots = []
+    for (start_h, start_m), (end_h, end_m) in WORK_WINDOWS:
+        slot_start = max(datetime.datetime.combine(day, datetime.time(start_h, start_m)), window_start)
+        slot_end = datetime.datetime.combine(day, datetime.time(end_h, end_m))
+        if window_end:
+            slot_end = min(slot_end, window_end)
+        for busy_start, busy_end in busy:
+            if slot_start >= slot_end:
+                break
+            if busy_end <= slot_start or busy_start >= slot_end:
+                continue
+            if busy_start > slot_start:
+                slots.append((slot_start, busy_start))
+            slot_start = max(slot_start, busy_end)
+        if slot_start < slot_end:
+            slots.append((slot_start, slot_end))
+    return slots
+
+def _take_slot(free_slots, duration_minutes):
+    """首次适配：从空闲区间中切出一段时长，返回 (开始, 结束) 或 None"""
+    if not duration_minutes:
+        return None
+    duration = datetime.timedelta(minutes=duration_minutes)
+    for index, (slot_start, slot_end) in enumerate(free_slots):
+        if slot_end - slot_start >= duration:
+            placed = (slot_start, slot_start + duration)
+            free_slots[index] = (placed[1], slot_end)
+            return placed
+    return None
+
+def _fill_gap(day, gap_start, gap_end, exclude_ids=()):
+    """用尚未安排的灵活任务按优先级填补空出来的时间段，返回需要写回的更新
+
+    exclude_ids 中的任务既不参与填补，也不计入占用（它们的新时间由调用方负责）。
+    """
+    if gap_start >= gap_end:
+        return []
+    scheduled = database_manager.get_scheduled_tasks(day.isoformat())
+    busy = _busy_intervals(scheduled, exclude_ids=exclude_ids)
+    free_slots = _free_slots(day, busy, gap_start, gap_end)
+    if not free_slots:
+        return []
+
+    candidates = [t for t in database_manager.get_flexible_tasks()
+                  if t['id'] not in exclude_ids and t['status'] == 'pending']
+    # 重复任务发生的ID是字符串，排在同优先级的普通任务之后
+    candidates.sort(key=lambda t: (PRIORITY_ORDER.get(t['priority'], 1), isinstance(t['id'], str), t['id']))
+    updates = []
+    for task in candidates:
+        placed = _take_slot(free_slots, task['duration_minutes'])
+        if placed:
+            updates.append((task['id'], _format_time(placed[0]), _format_time(placed[1])))
+    return updates
+
+def _apply(updates):
+    if updates and database_manager.update_task_schedules(updates):
+        print(f"[*] 增量重排完成，更新了 {len(updates)} 个任务的日程。")
+        return updates
+    return []
+
+
+def postpone_and_reschedule(task_id: int, now=None):
+    """顺延任务：先清空其时间，再尝试把它放到当天稍后的空闲时间，并用灵活任务填补空档"""
+    now = now or datetime.datetime.now()
+    task = database_manager.get_task(task_id)
+    if not task or not database_manager.postpone_task(task_id):
+        return []
+    start, end = _parse_time(task['start_time']), _parse_time(task['end_time'])
+    if not start:
+        return []
+    end = end or start + datetime.timedelta(minutes=task['duration_minutes'] or 0)
+
+    day = start.date()
+    updates = []
+    busy = _busy_intervals(database_manager.get_scheduled_tasks(day.isoformat()))
+    placed = _take_slot(_free_slots(day, busy, max(now, end)), task['duration_minutes'])
+    if placed:
+        updates.append((task_id, _format_time(placed[0]), _format_time(placed[1])))
+    updates += _fill_gap(day, max(now, start), end, exclude_ids={task_id})
+    return _apply(updates)
+
+def complete_and_reschedule(task_id: int, now=None):
+    """完成任务：如果提前完成，把剩余时间让给灵活任务"""
+    now = now or datetime.datetime.now()
+    task = database_manager.get_task(task_id)
+    if not task or not database_manager.update_task_status(task_id, 'completed'):
+        return []
+    start, end = _parse_time(task['start_time']), _parse_time(task['end_time'])
+    if not start or not end or now >= end:
+        return []
+    if start <= now:
+        # 进行中完成：记录实际结束时间，剩下的时间段才不会被当作占用
+        database_manager.update_task_schedule(task_id, task['start_time'], _format_time(now))
+    # 还没开始就完成时，整段原定时间都空了出来
+    return _apply(_fill_gap(start.date(), max(now, start), end))
+
+def delete_and_reschedule(task_id: int, now=None):
+    """删除任务：把它原本占用的、尚未过去的时间让给灵活任务"""
+    now = now or datetime.datetime.now()
+    task = database_manager.get_task(task_id)
+    if not task or not database_manager.delete_task(task_id):
+        return []
+    start, end = _parse_time(task['start_time']), _parse_time(task['end_time'])
+    if not start or not end or task['status'] != 'pending':
+        return []
+    return _apply(_fill_gap(start.date(), max(now, start), end))
+
+def update_duration_and_reschedule(task_id: int, new_duration: int, now=None):
+    """修改时长：变长后与其他日程冲突时只挪动这个任务本身，变短时用灵活任务填补空档"""
+    now = now or datetime.datetime.now()
+    task = database_manager.get_task(task_id)
+    if not task or task['duration_minutes'] == new_duration:
+        return []
+    if not database_manager.update_task_duration(task_id, new_duration):
+        return []
+    start, old_end = _parse_time(task['start_time']), _parse_time(task['end_time'])
+    if not start or task['status'] != 'pending':
+        return []
+    old_end = old_end or start + datetime.timedelta(minutes=task['duration_minutes'] or 0)
+
+    day = start.date()
+    new_end = start + datetime.timedelta(minutes=new_duration)
+    updates = [(task_id, task['start_time'], _format_time(new_end))]
+    if new_end <= old_end:
+        return _apply(updates + _fill_gap(day, max(now, new_end), old_end, exclude_ids={task_id}))
+
+    # 变长：其余日程保持不变。原位置放得下就原地延长，否则把这个任务挪到当天能放下的空闲时间
+    busy = _busy_intervals(database_manager.get_scheduled_tasks(day.isoformat()), exclude_ids={task_id})
+    if not any(busy_start < new_end and busy_end > start for busy_start, busy_end in busy):
+        return _apply(updates)
+    day_start = datetime.datetime.combine(day, datetime.time())
+    placed = _take_slot(_free_slots(day, busy, max(now, day_start)), new_duration)
+    if placed:
+        moved = [(task_id, _format_time(placed[0]), _format_time(placed[1]))]
+    else:
+        # 当天没有空位时退回为灵活任务，与顺延的行为保持一致
+        moved = [(task_id, None, None)]
+    moved = _apply(moved)
+    if not moved:
+        return []
+    # 先写回新位置，再用灵活任务填补原来的时间段，避免两者重叠
+    return moved + _apply(_fill_gap(day, max(now, start), old_end))